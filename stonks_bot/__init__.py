@@ -11,3 +11,11 @@ conf = config[environment]()
 from stonks_bot.currency import Currency
 
 c = Currency()
+
+# Init the symbol resolution cache, which is shared by all `Stonk` objects and survives restarts.
+from stonks_bot.helper.cache import TTLCache
+
+symbol_cache = TTLCache(ttl_sec=conf.CACHE['symbol_search']['ttl_sec'],
+                        size_max=conf.CACHE['symbol_search']['size_max'],
+                        filename=conf.CACHE['symbol_search']['filename'])
+symbol_cache.load()
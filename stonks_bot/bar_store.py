@@ -0,0 +1,198 @@
+import json
+import os
+import re
+from datetime import datetime
+from threading import Lock
+from time import time
+from typing import Dict, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from stonks_bot import conf
+from stonks_bot.helper.data import period_to_timedelta, yf_start
+
+COLUMNS_BAR = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+# Yahoo rejects intraday `start` values older than this (days). Older stores cannot be caught up by a tail download.
+LOOKBACK_DAYS_MAX = {'1m': 7, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '60m': 730, '90m': 60, '1h': 730}
+# The newest stored bar must not be older than this (days), otherwise the store is not used. Covers weekends and
+# holidays.
+RECENT_DAYS_MAX = 5
+
+
+class BarStore(object):
+    """On disk OHLCV store keyed by (symbol, interval). Bars are kept columnar as memory mapped NumPy arrays. Once a
+    period is covered, only the missing tail is downloaded and appended; slices are served from the mapped arrays."""
+    _locks: Dict[Tuple[str, str], Lock] = {}
+    _locks_lock: Lock = Lock()
+    path: str = None
+
+    def __init__(self, path: Union[str, None] = None):
+        self.path = path if path else conf.STORE['bars']['path']
+
+    def get(self, symbol: str, period: str, interval: str) -> pd.DataFrame:
+        """Returns the raw bars (exchange currency and time zone) of the last `period`."""
+        with self._get_lock(symbol, interval):
+            stored = self._load(symbol, interval)
+
+            if stored and time() - stored['meta']['fetched_at'] > conf.STORE['bars']['ttl_sec'][interval]:
+                stored = self._append_tail(symbol, interval, stored)
+
+            if not stored or not self._is_covered(stored, period):
+                stored = self._download_full(symbol, period, interval)
+
+            if not stored:
+                return pd.DataFrame(columns=COLUMNS_BAR)
+
+            return self._slice(stored, period)
+
+    def _get_lock(self, symbol: str, interval: str) -> Lock:
+        key = (symbol, interval)
+
+        with self._locks_lock:
+            if key not in self._locks:
+                self._locks[key] = Lock()
+
+            return self._locks[key]
+
+    def _get_dir(self, symbol: str, interval: str) -> str:
+        symbol_safe = re.sub(r'[^A-Za-z0-9.\-_=^]', '_', symbol)
+
+        return os.path.join(self.path, interval, symbol_safe)
+
+    def _load(self, symbol: str, interval: str) -> Union[dict, bool]:
+        path_dir = self._get_dir(symbol, interval)
+        path_meta = os.path.join(path_dir, 'meta.json')
+
+        if not os.path.isfile(path_meta):
+            return False
+
+        with open(path_meta, 'r') as f:
+            meta = json.load(f)
+
+        index = np.load(os.path.join(path_dir, 'index.npy'), mmap_mode='r')
+        data = np.load(os.path.join(path_dir, 'data.npy'), mmap_mode='r')
+
+        if index.shape[0] != data.shape[1]:
+            return False
+
+        return {'meta': meta, 'index': index, 'data': data}
+
+    def _save(self, symbol: str, interval: str, index: np.ndarray, data: np.ndarray, meta: dict) -> dict:
+        path_dir = self._get_dir(symbol, interval)
+        os.makedirs(path_dir, exist_ok=True)
+        rows_max = conf.STORE['bars']['rows_max']
+
+        if index.shape[0] > rows_max:
+            index = index[-rows_max:]
+            data = data[:, -rows_max:]
+            meta['covered_from'] = int(index[0]) / 1e9
+
+        # Replace the files atomically, so already mapped arrays stay valid.
+        for name, arr in (('index.npy', index), ('data.npy', data)):
+            path_tmp = os.path.join(path_dir, f'{name}.tmp')
+
+            with open(path_tmp, 'wb') as f:
+                np.save(f, arr)
+
+            os.replace(path_tmp, os.path.join(path_dir, name))
+
+        path_tmp = os.path.join(path_dir, 'meta.json.tmp')
+
+        with open(path_tmp, 'w') as f:
+            json.dump(meta, f)
+
+        os.replace(path_tmp, os.path.join(path_dir, 'meta.json'))
+
+        return self._load(symbol, interval)
+
+    def _download(self, symbol: str, interval: str, period: Union[str, None] = None,
+                  start: Union[datetime, None] = None) -> pd.DataFrame:
+        timespan = {'start': start} if start else {'period': period}
+        yf_df = yf.download(tickers=symbol, interval=interval, group_by='ticker', prepost=True, progress=False,
+                            **timespan)
+
+        return yf_df.reindex(columns=COLUMNS_BAR).dropna(how='all')
+
+    def _download_full(self, symbol: str, period: str, interval: str) -> Union[dict, bool]:
+        now = time()
+        yf_df = self._download(symbol, interval, period=period)
+
+        if len(yf_df) == 0:
+            return False
+
+        index, tz = self._index_to_array(yf_df.index)
+        meta = {'fetched_at': now, 'covered_from': now - period_to_timedelta(period).total_seconds(), 'tz': tz}
+
+        return self._save(symbol, interval, index, self._frame_to_array(yf_df), meta)
+
+    def _append_tail(self, symbol: str, interval: str, stored: dict) -> Union[dict, bool]:
+        """Returns `False`, if the tail cannot be fetched, so the caller downloads the whole period again."""
+        now = time()
+        meta = dict(stored['meta'])
+        ts_last = pd.Timestamp(int(stored['index'][-1]))
+
+        if interval in LOOKBACK_DAYS_MAX and now - ts_last.value / 1e9 > LOOKBACK_DAYS_MAX[interval] * 86400:
+            return False
+
+        # Timezone aware indexes are stored in UTC, naive ones (e.g. daily bars) unchanged.
+        start = ts_last.tz_localize('UTC') if meta['tz'] else ts_last
+        yf_df = self._download(symbol, interval, start=yf_start(start.to_pydatetime()))
+
+        if len(yf_df) == 0:
+            # yfinance swallows errors, so an empty tail is either no new bar (e.g. weekend) or a failed request. The
+            # store is served as it is, but `fetched_at` is kept, thus the tail is requested again next time.
+            return stored
+
+        index_tail, _ = self._index_to_array(yf_df.index)
+        # The last stored bar might have been incomplete, thus it is replaced by the newly fetched one.
+        keep = np.asarray(stored['index']) < index_tail[0]
+        index = np.concatenate((np.asarray(stored['index'])[keep], index_tail))
+        data = np.concatenate((np.asarray(stored['data'])[:, keep], self._frame_to_array(yf_df)), axis=1)
+        meta['fetched_at'] = now
+
+        return self._save(symbol, interval, index, data, meta)
+
+    def _is_covered(self, stored: dict, period: str) -> bool:
+        if time() - int(stored['index'][-1]) / 1e9 > RECENT_DAYS_MAX * 86400:
+            return False
+
+        if period.endswith('d'):
+            # Day periods are trading days, so the store needs to contain enough distinct dates.
+            days = int(period[:-1])
+
+            return len(np.unique(self._array_to_index(stored).date)) >= days
+
+        return stored['meta']['covered_from'] <= time() - period_to_timedelta(period).total_seconds()
+
+    def _slice(self, stored: dict, period: str) -> pd.DataFrame:
+        index = self._array_to_index(stored)
+
+        if period.endswith('d'):
+            dates = index.date
+            dates_unique = np.unique(dates)
+            pos = np.searchsorted(dates, dates_unique[-int(period[:-1]):][0]) if len(dates_unique) > 0 else 0
+        else:
+            ts_start = (time() - period_to_timedelta(period).total_seconds()) * 1e9
+            pos = int(np.searchsorted(stored['index'], ts_start))
+
+        # Views on the memory mapped arrays, no copy is made here.
+        data = stored['data'][:, pos:]
+
+        return pd.DataFrame(data.T, index=index[pos:], columns=COLUMNS_BAR, copy=False)
+
+    def _array_to_index(self, stored: dict) -> pd.DatetimeIndex:
+        tz = stored['meta']['tz']
+        index = pd.DatetimeIndex(np.asarray(stored['index']).view('datetime64[ns]'))
+
+        return index.tz_localize('UTC').tz_convert(tz) if tz else index
+
+    def _index_to_array(self, index: pd.DatetimeIndex) -> Tuple[np.ndarray, Union[str, None]]:
+        tz = str(index.tz) if index.tz is not None else None
+
+        return np.asarray(index.asi8, dtype=np.int64), tz
+
+    def _frame_to_array(self, yf_df: pd.DataFrame) -> np.ndarray:
+        # Columnar layout: One row per field, one column per bar.
+        return np.ascontiguousarray(yf_df[COLUMNS_BAR].to_numpy(dtype=np.float64).T)
@@ -18,26 +18,39 @@ import html
 import logging
 from collections import defaultdict
 from datetime import datetime, timedelta
+from io import BytesIO
 from typing import Union, NoReturn, List
 
 import pandas as pd
+import pytz
 from telegram import Message, error, Update, Chat, ParseMode
 from telegram.ext import (
     Updater, CommandHandler, CallbackContext, ChatMemberHandler, PicklePersistence, MessageHandler, Filters
 )
 
-from stonks_bot import conf
+from stonks_bot import conf, symbol_cache
+from stonks_bot.dataclasses.chart_image import ChartImage
 from stonks_bot.discovery import Discovery
-from stonks_bot.helper.args import parse_symbols, parse_daily_perf_count, parse_reddit
-from stonks_bot.helper.command import restricted_command, send_typing_action, check_symbol_limit, log_error
+from stonks_bot.exchange_rates import exchange_rates
+from stonks_bot.helper.args import parse_symbols, parse_daily_perf_count, parse_reddit, parse_chart, \
+    parse_symbol_list, parse_symbol_csv
+from stonks_bot.helper.command import restricted_command, send_typing_action, check_symbol_limit, log_error, \
+    get_symbols_remaining
 from stonks_bot.helper.data import factory_defaultdict
-from stonks_bot.helper.exceptions import InvalidSymbol
+from stonks_bot.helper.exceptions import InvalidSymbol, UnsupportedQuoteType
+from stonks_bot.helper.fanout import fan_out
 from stonks_bot.helper.formatters import formatter_conditional_no_dec, formatter_to_json
 from stonks_bot.helper.handler import error_handler, track_chats, greet_chat_members, log_message_handler, \
     bot_removed_from
 from stonks_bot.helper.math import round_currency_scalar
-from stonks_bot.helper.message import reply_with_photo, reply_symbol_error, reply_message, send_photo, \
-    reply_command_unknown, send_message, reply_random_gif
+from stonks_bot.helper.message import reply_with_photo, reply_symbol_error, reply_message, \
+    reply_command_unknown, send_message, reply_random_gif, reply_with_media_group, send_media_group, \
+    reply_gif_symbol_missing
+from stonks_bot.helper.render import render_pool
+from stonks_bot.helper.singleflight import SingleFlight
+from stonks_bot.market import Market
+from stonks_bot.quote import Quote
+from stonks_bot.registry import StonkRegistry
 from stonks_bot.sentiment.redditanalysis import RedditAnalysis
 from stonks_bot.sentiment.stocktwits import Stocktwits
 from stonks_bot.stonk import Stonk
@@ -63,10 +76,10 @@ def help(update: Update, context: CallbackContext) -> NoReturn:
     reply = """Hi ape, I am the STONKS BOT! Try to use the following commands:
 * /help | /h -> This help.
 Fundamental:
-* /chart [<SYMBOLs/ISINs>] | /c -> Plot the last trading day of a stock.
+* /chart [<SYMBOLs/ISINs>] [1d|5d|1mo|6mo|1y|5y] | /c -> Plot the last trading day (or the given period) of a stock.
 * /price | /p [<SYMBOLs/ISINs>] -> Get details about the stonk price
 * /details | /d [<SYMBOLs/ISINs>] -> Shortcut for /chart & /price.
-* /stonk_add [<SYMBOLs/ISINs>] | /sa -> Add a stock to the watchlist.
+* /stonk_add [<SYMBOLs/ISINs>] | /sa -> Add stocks to the watchlist (also from an attached / replied CSV file).
 * /stonk_del [<SYMBOLs/ISINs>] | /sd -> Delete a stock from the watchlist.
 * /stonk_list | /sl -> Show the watchlist.
 * /stonk_clear | /sc -> Clears the watchlist (not allowed in group chats).
@@ -117,12 +130,22 @@ def help_admin(update: Update, context: CallbackContext) -> NoReturn:
 * /all_stonk_clear | /asc -> Clears all stonk lists of all chats.
 * /bot_list_all_data | /blad -> Lists internal data storage.
 * /show_chats -> Lists all chats.
+* /show_coalesced -> Shows how many backend calls were coalesced (shared by concurrent callers).
 * /chat_data_reset | /acdr -> Clear all chat data in `bot_data`.
 """
 
     reply_message(update, reply)
 
 
+@restricted_command(error_handler, 'Command execution forbidden (restricted access).')
+def show_coalesced(update: Update, context: CallbackContext) -> None:
+    """Shows the counters of the backend call coalescing."""
+    df = pd.DataFrame.from_dict(SingleFlight.stats_all(), orient='index')
+    text = df.to_string() if len(df) > 0 else 'N/A'
+
+    reply_message(update, text, pre=True, parse_mode=ParseMode.HTML)
+
+
 @restricted_command(error_handler, 'Command execution forbidden (restricted access).')
 def show_chats(update: Update, context: CallbackContext) -> None:
     """Shows which chats the bot is in"""
@@ -187,35 +210,119 @@ def chat_data_reset(update: Update, context: CallbackContext) -> None:
 
 @check_symbol_limit
 def stonk_add(update: Update, context: CallbackContext) -> Union[None, bool]:
-    symbols = parse_symbols(update, context.args)
+    symbols = parse_stonk_add(update, context)
 
     if len(symbols) == 0:
+        reply_gif_symbol_missing(update)
+
         return False
+    elif len(symbols) > 1:
+        return stonk_add_bulk(update, context, symbols)
 
-    for symbol in symbols:
-        s = False
+    symbol = symbols[0]
 
-        try:
-            s = Stonk(symbol)
-        except InvalidSymbol:
-            reply_symbol_error(update, symbol)
+    try:
+        s = Stonk(symbol)
+    except InvalidSymbol:
+        reply_symbol_error(update, symbol)
 
-            return False
+        return False
 
-        stonks = context.chat_data.get(conf.INTERNALS['stock'], {})
+    stonks = context.chat_data.get(conf.INTERNALS['stock'], {})
 
-        if s.symbol not in stonks:
-            stonks[s.symbol] = s
-            context.chat_data[conf.INTERNALS['stock']] = stonks
+    if s.symbol not in stonks:
+        sr = StonkRegistry(context.bot_data)
+        s = sr.acquire(s)
+        stonks[s.symbol] = datetime.now()
+        context.chat_data[conf.INTERNALS['stock']] = stonks
+
+        reply = f"✅ {s.name} ({s.symbol}; ISIN: {s.isin}) added to watchlist."
+    else:
+        stonk_list(update, context)
+        reply_random_gif(update, 'boring')
+
+        reply = f"⚠️ {s.name} ({s.symbol}; ISIN: {s.isin}) is already in the watchlist."
+
+    reply_message(update, reply)
+
+
+def parse_stonk_add(update: Update, context: CallbackContext) -> List[str]:
+    """Symbols can be passed as arguments (a pasted list) and / or as CSV file, which is attached to the command or to
+    the message the command replies to."""
+    msg = update.effective_message
+    # Commands in a caption (CSV attachment) are not parsed by the command handler.
+    args = context.args if context.args is not None else (msg.caption or '').split()[1:]
+    symbols = parse_symbol_list(' '.join(args))
 
-            reply = f"✅ {s.name} ({s.symbol}; ISIN: {s.isin}) added to watchlist."
+    for m in (msg, msg.reply_to_message):
+        if m and m.document and (m.document.file_name or '').lower().endswith('.csv'):
+            if m.document.file_size and m.document.file_size > conf.FAN_OUT['stonk_add']['csv_bytes_max']:
+                reply_message(update, '❌ The CSV file is too big.')
+
+                continue
+
+            buf = BytesIO()
+            m.document.get_file().download(out=buf)
+            symbols += parse_symbol_csv(buf.getvalue().decode('utf-8-sig', errors='replace'))
+
+    return list(dict.fromkeys(symbols))
+
+
+def stonk_add_bulk(update: Update, context: CallbackContext, symbols: List[str]) -> NoReturn:
+    """Resolves all symbols at the same time, loads their info data batched and replies with one summary."""
+    fo = conf.FAN_OUT['stonk_add']
+    results = fan_out(Stonk, symbols, workers=fo['workers'], deadline_sec=fo['deadline_sec'])
+    stonks = context.chat_data.get(conf.INTERNALS['stock'], {})
+    remaining = get_symbols_remaining(update, context)
+    sr = StonkRegistry(context.bot_data)
+    added = []
+    existing = []
+    invalid = []
+    unsupported = []
+    failed = []
+    over_limit = []
+
+    for symbol, s in zip(symbols, results):
+        if isinstance(s, InvalidSymbol):
+            invalid.append(symbol)
+        elif isinstance(s, UnsupportedQuoteType):
+            unsupported.append(symbol)
+        elif isinstance(s, Exception):
+            logger.error(msg=f'Symbol "{symbol}" could not be resolved.', exc_info=s)
+            failed.append(symbol)
+        elif s.symbol in stonks:
+            existing.append(s.symbol)
+        elif remaining is not None and len(added) >= remaining:
+            over_limit.append(s.symbol)
         else:
-            stonk_list(update, context)
-            reply_random_gif(update, 'boring')
+            s = sr.acquire(s)
+            stonks[s.symbol] = datetime.now()
+            added.append(s)
+
+    context.chat_data[conf.INTERNALS['stock']] = stonks
+
+    try:
+        Stonk.load_info_data_batch(added)
+    except Exception as e:
+        # Names fall back to the search results; the info data is loaded again on demand.
+        logger.error(msg='Info data of added symbols could not be loaded.', exc_info=e)
 
-            reply = f"⚠️ {s.name} ({s.symbol}; ISIN: {s.isin}) is already in the watchlist."
+    lines = []
 
-        reply_message(update, reply)
+    if added:
+        lines.append(f'✅ Added to watchlist ({len(added)}): ' + ', '.join(f'{s.name} ({s.symbol})' for s in added))
+    if existing:
+        lines.append(f'⚠️ Already in the watchlist ({len(existing)}): ' + ', '.join(existing))
+    if over_limit:
+        lines.append(f'🚫 Not added, watchlist limit reached ({len(over_limit)}): ' + ', '.join(over_limit))
+    if invalid:
+        lines.append(f'❌ Symbols do not exist ({len(invalid)}): ' + ', '.join(invalid))
+    if unsupported:
+        lines.append(f'🚫 Not supported (e.g. ETFs) ({len(unsupported)}): ' + ', '.join(unsupported))
+    if failed:
+        lines.append(f'❌ Symbols could not be checked, try again ({len(failed)}): ' + ', '.join(failed))
+
+    reply_message(update, '\n\n'.join(lines))
 
 
 def stonk_del(update: Update, context: CallbackContext) -> Union[None, bool]:
@@ -231,6 +338,7 @@ def stonk_del(update: Update, context: CallbackContext) -> Union[None, bool]:
         if symbol in stonks:
             stonks.pop(symbol, None)
             context.chat_data[conf.INTERNALS['stock']] = stonks
+            StonkRegistry(context.bot_data).release(symbol)
             msg_daily = get_daily_dict(context.chat_data)
 
             rise = msg_daily.get(conf.JOBS['check_rise_fall_day']['dict']['rise'], factory_defaultdict())
@@ -252,6 +360,8 @@ def stonk_del(update: Update, context: CallbackContext) -> Union[None, bool]:
 @restricted_command(error_handler, 'Execution of this command in a group chat is forbidden (restricted access).',
                     in_private=False)
 def stonk_clear(update: Update, context: CallbackContext) -> NoReturn:
+    stonks = context.chat_data.get(conf.INTERNALS['stock'], {})
+    StonkRegistry(context.bot_data).release_all(list(stonks.keys()))
     context.chat_data[conf.INTERNALS['stock']] = {}
     # clear_daily_dict(context.chat_data)
     reply = f'🖤 Watch list purged.'
@@ -266,7 +376,7 @@ def all_stonk_clear(update: Update, context: CallbackContext) -> NoReturn:
     cleared_chats = []
 
     for chat_id, chat_dict in global_chat_data.items():
-        result_clear = clear_chat_data_stonk(chat_dict)
+        result_clear = clear_chat_data_stonk(chat_dict, context.bot_data)
 
         if result_clear:
             cleared_chats.append(chat_id)
@@ -282,13 +392,16 @@ def all_stonk_clear(update: Update, context: CallbackContext) -> NoReturn:
             error_handler(update, context, error_message)
             global_chat_data.pop(chat_id, None)
 
+    StonkRegistry(context.bot_data).sync(global_chat_data)
 
-def clear_chat_data_stonk(chat_data: defaultdict) -> bool:
+
+def clear_chat_data_stonk(chat_data: defaultdict, bot_data: dict) -> bool:
     stonks = chat_data.get(conf.INTERNALS['stock'], None)
     daily = get_daily_dict(chat_data)
     cleared = False
 
     if stonks and len(stonks) > 0:
+        StonkRegistry(bot_data).release_all(list(stonks.keys()))
         chat_data[conf.INTERNALS['stock']] = factory_defaultdict()
         cleared = True
 
@@ -313,11 +426,13 @@ def clear_chat_data_stonk(chat_data: defaultdict) -> bool:
 
 def stonk_list(update: Update, context: CallbackContext) -> NoReturn:
     stonks = context.chat_data.get(conf.INTERNALS['stock'], {})
+    sr = StonkRegistry(context.bot_data)
     reply = ''
 
     if len(stonks) > 0:
         for k in sorted(stonks.keys()):
-            reply += f'💎 {stonks[k].name} ({k})\n'
+            s = sr.get(k)
+            reply += f'💎 {s.name if s else k} ({k})\n'
 
         reply = reply[0:-1]
     else:
@@ -333,10 +448,17 @@ def list_price(update: Update, context: CallbackContext) -> NoReturn:
     data = []
 
     if len(stonks) > 0:
-        for k, s in sorted(stonks.items()):
-            dp = s.price_daily()
+        symbols = sorted(stonks.keys())
+        # All daily bars of the watch list are fetched at once.
+        prices = Market().price_daily(symbols)
+
+        for symbol in symbols:
+            dp = prices.get(symbol, None)
+
+            if not dp:
+                continue
 
-            data.append([s.symbol, dp.high, dp.low, dp.close, dp.diff, dp.percent])
+            data.append([symbol, dp.high, dp.low, dp.close, dp.diff, dp.percent])
 
         df = pd.DataFrame(data, columns=columns)
         reply = df.to_string(index=False, formatters={
@@ -355,36 +477,93 @@ def list_price(update: Update, context: CallbackContext) -> NoReturn:
 
 @send_typing_action
 def chart(update: Update, context: CallbackContext, reply: bool = True,
-          symbols: Union[bool, List[Union[None, str]]] = False, caption: str = '', pre: bool = True) -> NoReturn:
+          symbols: Union[bool, List[Union[None, str]]] = False, caption: str = '', pre: bool = True,
+          period: str = '1d') -> NoReturn:
     if not symbols:
-        symbols = parse_symbols(update, context.args)
+        symbols, period = parse_chart(update, context.args)
 
     if len(symbols) == 0:
         return False
 
-    for symbol in symbols:
-        try:
-            s = Stonk(symbol)
-        except InvalidSymbol:
+    # Fetch and render all charts at the same time, thus the latency is close to the one of the slowest chart.
+    fo = conf.FAN_OUT['chart']
+    results = fan_out(lambda symbol: Stonk(symbol).chart(period), symbols, workers=fo['workers'],
+                      deadline_sec=fo['deadline_sec'])
+    charts = []
+
+    for symbol, ci in zip(symbols, results):
+        if isinstance(ci, InvalidSymbol):
             reply_symbol_error(update, symbol)
+        elif isinstance(ci, Exception):
+            # One failed chart must not hold back the others.
+            logger.error(msg=f'Chart of "{symbol}" could not be created.', exc_info=ci)
+            text = f'❌ Chart of {symbol} is not available right now.'
+
+            if reply:
+                reply_message(update, text)
+            else:
+                send_message(context, update.effective_message.chat_id, text)
+        else:
+            charts.append(ci)
 
-            continue
+    if len(charts) == 0:
+        return False
 
-        c_buf = s.chart()
+    reply_charts(update, context, charts, reply=reply, caption=caption, pre=pre)
 
-        if reply:
-            reply_with_photo(update, c_buf, caption=caption, pre=pre)
-        else:
-            send_photo(context, update.effective_message.chat_id, c_buf, caption=caption, pre=pre)
+
+def reply_charts(update: Update, context: CallbackContext, charts: List[ChartImage], reply: bool = True,
+                 caption: str = '', pre: bool = True) -> NoReturn:
+    photos = [ci.photo for ci in charts]
+
+    if reply:
+        msgs = reply_with_media_group(update, photos, caption=caption, pre=pre)
+    else:
+        msgs = send_media_group(context, update.effective_message.chat_id, photos, caption=caption, pre=pre)
+
+    # Remember the uploaded files, so further sends of the same chart (e.g. alerts to many chats) upload nothing.
+    for ci, msg in zip(charts, msgs):
+        if not ci.file_id and msg and msg.photo:
+            ci.file_id = msg.photo[-1].file_id
 
 
 def check_rise_fall_day(context: CallbackContext) -> NoReturn:
-    chat_data = context.job.context.dispatcher.chat_data
+    dispatcher = context.job.context.dispatcher
+    chat_data = dispatcher.chat_data
+    sr = StonkRegistry(dispatcher.bot_data)
     datetime_now = datetime.now()
     date_now = datetime_now.date()
     datetime_zero = datetime.fromtimestamp(0)
+    symbols = set()
 
+    # Stage 1: Collect the unique symbols of all chats, which still need to be checked today, and fetch them batched.
     for c_id, cd in chat_data.items():
+        stonks = cd.get(conf.INTERNALS['stock'], {})
+        msg_daily = get_daily_dict(cd)
+        daily_rise = msg_daily[conf.JOBS['check_rise_fall_day']['dict']['rise']]
+        daily_fall = msg_daily[conf.JOBS['check_rise_fall_day']['dict']['fall']]
+
+        for symbol in stonks.keys():
+            msg_last_rise_at = daily_rise.get(symbol, datetime_zero).date()
+            msg_last_fall_at = daily_fall.get(symbol, datetime_zero).date()
+
+            if msg_last_rise_at < date_now or msg_last_fall_at < date_now:
+                symbols.add(symbol)
+
+    symbols = [symbol for symbol in sorted(symbols) if sr.get(symbol)]
+
+    if len(symbols) == 0:
+        return
+
+    stonks_check = [sr.get(symbol) for symbol in symbols]
+    bars = Market().intraday_bars(stonks_check)
+    calculated = {}
+
+    for stonk in stonks_check:
+        calculated[stonk.symbol] = stonk.calculate_perf_rise_fall_daily(bars[stonk.symbol])
+
+    # Stage 2: Evaluate the thresholds and fan the results out to the chats.
+    for c_id, cd in list(chat_data.items()):
         stonks = cd.get(conf.INTERNALS['stock'], {})
         chat_custom = Chat(c_id, 'group')
         message_custom = Message(0, datetime_now, chat=chat_custom)
@@ -392,51 +571,79 @@ def check_rise_fall_day(context: CallbackContext) -> NoReturn:
         msg_daily = get_daily_dict(cd)
         daily_rise = msg_daily[conf.JOBS['check_rise_fall_day']['dict']['rise']]
         daily_fall = msg_daily[conf.JOBS['check_rise_fall_day']['dict']['fall']]
+        chat_removed = False
+
+        for symbol in list(stonks.keys()):
+            stonk = sr.get(symbol)
+            res_calc = calculated.get(symbol, False)
+
+            if not stonk or not res_calc:
+                continue
 
-        for symbol, stonk in stonks.items():
             msg_last_rise_at = daily_rise.get(symbol, datetime_zero).date()
             msg_last_fall_at = daily_fall.get(symbol, datetime_zero).date()
             context.args = [symbol]
+            to_send_message = []
 
-            if msg_last_rise_at == date_now and msg_last_fall_at == date_now:
-                continue
+            if stonk.daily_rise.calculated_at.date() == date_now and msg_last_rise_at < date_now:
+                if stonk.daily_rise.percent >= conf.JOBS['check_rise_fall_day']['threshold_perc_rise']:
+                    text = f"🚀🚀🚀 {stonk.name} ({stonk.symbol}) is rocketing to " \
+                           f"{round_currency_scalar(stonk.daily_rise.price)} " \
+                           f"{conf.LOCAL['currency']} (+{stonk.daily_rise.percent.round(2)}%)"
+                    to_send_message.append(text)
+                    daily_rise[symbol] = datetime_now
+
+            if stonk.daily_fall.calculated_at.date() == date_now and msg_last_fall_at < date_now:
+                if stonk.daily_fall.percent <= conf.JOBS['check_rise_fall_day']['threshold_perc_fall']:
+                    text = f"📉📉📉 {stonk.name} ({stonk.symbol}) is drow" \
+                           f"ning to {round_currency_scalar(stonk.daily_fall.price)} " \
+                           f"{conf.LOCAL['currency']} ({stonk.daily_fall.percent.round(2)}%)"
+                    to_send_message.append(text)
+                    daily_fall[symbol] = datetime_now
+
+            for message in to_send_message:
+                try:
+                    send_message(context, c_id, message)
+                    chart(update_custom, context, reply=False, symbols=[stonk.symbol])
+                except error.Unauthorized:
+                    error_message = f'Rise/Fall check: User ID {c_id} blocked our bot. Thus, this user was will ' \
+                                    f'be removed from chat_data.'
+                    error_handler(update_custom, context, error_message)
+
+                    sr.release_all(list(stonks.keys()))
+                    dispatcher.chat_data.pop(c_id, None)
+                    chat_removed = True
+
+                    break
+
+            # The chat is gone, thus its remaining symbols must neither alert nor be released again.
+            if chat_removed:
+                break
+
+
+def precompute_reference_prices(context: CallbackContext) -> NoReturn:
+    sr = StonkRegistry(context.job.context.dispatcher.bot_data)
+
+    for symbol, stonk in sr.items():
+        try:
+            stonk.reference_prices()
+        except Exception as e:
+            logger.error(msg=f'Reference prices of "{symbol}" could not be calculated.', exc_info=e)
 
-            res_calc = stonk.calculate_perf_rise_fall_daily()
-            to_send_message = []
 
-            if res_calc:
-                if stonk.daily_rise.calculated_at.date() == date_now and msg_last_rise_at < date_now:
-                    if stonk.daily_rise.percent >= conf.JOBS['check_rise_fall_day']['threshold_perc_rise']:
-                        text = f"🚀🚀🚀 {stonk.name} ({stonk.symbol}) is rocketing to " \
-                               f"{round_currency_scalar(stonk.daily_rise.price)} " \
-                               f"{conf.LOCAL['currency']} (+{stonk.daily_rise.percent.round(2)}%)"
-                        to_send_message.append(text)
-                        daily_rise[symbol] = datetime_now
-
-                if stonk.daily_fall.calculated_at.date() == date_now and msg_last_fall_at < date_now:
-                    if stonk.daily_fall.percent <= conf.JOBS['check_rise_fall_day']['threshold_perc_fall']:
-                        text = f"📉📉📉 {stonk.name} ({stonk.symbol}) is drow" \
-                               f"ning to {round_currency_scalar(stonk.daily_fall.price)} " \
-                               f"{conf.LOCAL['currency']} ({stonk.daily_fall.percent.round(2)}%)"
-                        to_send_message.append(text)
-                        daily_fall[symbol] = datetime_now
-
-                for message in to_send_message:
-                    try:
-                        send_message(context, c_id, message)
-                        chart(update_custom, context, reply=False, symbols=[stonk.symbol])
-                    except error.Unauthorized:
-                        error_message = f'Rise/Fall check: User ID {c_id} blocked our bot. Thus, this user was will ' \
-                                        f'be removed from chat_data.'
-                        error_handler(update_custom, context, error_message)
-
-                        del context.job.context.dispatcher.chat_data[c_id]
-
-                        break
+def cache_persist(context: CallbackContext) -> NoReturn:
+    symbol_cache.dump()
+
+
+def exchange_rates_refresh(context: CallbackContext) -> NoReturn:
+    # Readers are served from the current snapshot meanwhile, thus no command waits for this refresh.
+    exchange_rates.refresh()
 
 
 def bot_init(updater: Updater) -> NoReturn:
-    pass
+    dispatcher = updater.dispatcher
+    # Migrate the watch lists to the shared symbol registry and fix the reference counts.
+    StonkRegistry(dispatcher.bot_data).sync(dispatcher.chat_data)
 
 
 def get_daily_dict(chat_data: dict) -> defaultdict:
@@ -475,24 +682,28 @@ def upcoming_earnings(update: Update, context: CallbackContext):
 
 @send_typing_action
 def stonk_upcoming_earnings(update: Update, context: CallbackContext):
-    # TODO: Optimize this to load all symbols for event lookup in one go instead of per symbol.
     stonks = context.chat_data.get(conf.INTERNALS['stock'], {})
+    sr = StonkRegistry(context.bot_data)
     columns = ['Company', 'Sym.', 'Date', '-days']
     data = []
 
     if len(stonks) > 0:
         now = datetime.now()
+        symbols = sorted(stonks.keys())
+        # The earning dates of all symbols are looked up in one go.
+        quotes = Quote().fetch(symbols)
 
-        for k, s in sorted(stonks.items()):
-            ue = s.upcoming_earning()
+        for symbol in symbols:
+            s = sr.get(symbol)
+            ue = quotes.loc[symbol, 'earnings_at'] if symbol in quotes.index else pd.NaT
             date = 'N/A'
             days_left = 'N/A'
 
-            if ue:
+            if not pd.isna(ue):
                 date = ue.strftime('%Y-%m-%d')
                 days_left = (ue - now).days
 
-            data.append([s.name, s.symbol, date, days_left])
+            data.append([s.name if s else symbol, symbol, date, days_left])
 
         df = pd.DataFrame(data, columns=columns)
         reply = df.to_string(index=False, formatters={'Company': '{:.10}'.format})
@@ -822,15 +1033,18 @@ def price(update: Update, context: CallbackContext, reply: bool = True,
     if len(symbols) == 0:
         return False
 
-    for symbol in symbols:
-        try:
-            s = Stonk(symbol)
-        except InvalidSymbol:
+    fo = conf.FAN_OUT['price']
+    results = fan_out(lambda symbol: Stonk(symbol).details_price_textual(), symbols, workers=fo['workers'],
+                      deadline_sec=fo['deadline_sec'])
+
+    for symbol, p_text in zip(symbols, results):
+        if isinstance(p_text, InvalidSymbol):
             reply_symbol_error(update, symbol)
 
             continue
-
-        p_text = s.details_price_textual()
+        elif isinstance(p_text, Exception):
+            logger.error(msg=f'Price of "{symbol}" could not be fetched.', exc_info=p_text)
+            p_text = f'❌ Price of {symbol} is not available right now.'
 
         if reply:
             reply_message(update, p_text, parse_mode=ParseMode.HTML, pre=True)
@@ -855,12 +1069,9 @@ def details(update: Update, context: CallbackContext, reply: bool = True,
 
             continue
 
-        p_text = s.details_price_textual()
-
-        if reply:
-            chart(update, context, symbols=[symbol], caption=p_text, pre=True)
-        else:
-            chart(update, context, reply=reply, pre=True)
+        # One download feeds both, the price table and the chart.
+        p_text, ci = s.details()
+        reply_charts(update, context, [ci], reply=reply, caption=p_text, pre=True)
 
 
 @send_typing_action
@@ -892,10 +1103,14 @@ def main() -> NoReturn:
     dispatcher.add_handler(CommandHandler('help_admin', help_admin, run_async=True))
     dispatcher.add_handler(CommandHandler('ha', help_admin, run_async=True))
     dispatcher.add_handler(CommandHandler('show_chats', show_chats, run_async=True))
+    dispatcher.add_handler(CommandHandler('show_coalesced', show_coalesced, run_async=True))
     dispatcher.add_handler(CommandHandler('chat_data_reset', chat_data_reset, run_async=True))
     dispatcher.add_handler(CommandHandler('acdr', chat_data_reset, run_async=True))
     dispatcher.add_handler(CommandHandler('stonk_add', stonk_add))
     dispatcher.add_handler(CommandHandler('sa', stonk_add))
+    dispatcher.add_handler(MessageHandler(
+            Filters.document.file_extension('csv') & Filters.caption_regex(r'^/(stonk_add|sa)(@\w+)?(\s|$)'),
+            stonk_add))
     dispatcher.add_handler(CommandHandler('stonk_del', stonk_del))
     dispatcher.add_handler(CommandHandler('sd', stonk_del))
     dispatcher.add_handler(CommandHandler('stonk_clear', stonk_clear))
@@ -904,8 +1119,8 @@ def main() -> NoReturn:
     dispatcher.add_handler(CommandHandler('sl', stonk_list, run_async=True))
     dispatcher.add_handler(CommandHandler('list_price', list_price, run_async=True))
     dispatcher.add_handler(CommandHandler('lp', list_price, run_async=True))
-    dispatcher.add_handler(CommandHandler('chart', chart, run_async=False))
-    dispatcher.add_handler(CommandHandler('c', chart, run_async=False))
+    dispatcher.add_handler(CommandHandler('chart', chart, run_async=True))
+    dispatcher.add_handler(CommandHandler('c', chart, run_async=True))
     dispatcher.add_handler(CommandHandler('discovery', discovery_websites, run_async=True))
     dispatcher.add_handler(CommandHandler('di', discovery_websites, run_async=True))
     dispatcher.add_handler(CommandHandler('sector_performance', sector_performance, run_async=True))
@@ -968,8 +1183,8 @@ def main() -> NoReturn:
     dispatcher.add_handler(CommandHandler('ts', trending_symbols, run_async=True))
     dispatcher.add_handler(CommandHandler('price', price, run_async=True))
     dispatcher.add_handler(CommandHandler('p', price, run_async=True))
-    dispatcher.add_handler(CommandHandler('details', details, run_async=False))
-    dispatcher.add_handler(CommandHandler('d', details, run_async=False))
+    dispatcher.add_handler(CommandHandler('details', details, run_async=True))
+    dispatcher.add_handler(CommandHandler('d', details, run_async=True))
     dispatcher.add_handler(CommandHandler('rsamoyedcoin', r_samoyed_coin, run_async=True))
     dispatcher.add_handler(CommandHandler('rsc', r_samoyed_coin, run_async=True))
 
@@ -989,6 +1204,11 @@ def main() -> NoReturn:
     job_queue = updater.job_queue
     job_queue.run_repeating(check_rise_fall_day, conf.JOBS['check_rise_fall_day']['interval_sec'],
                             context=updater)
+    job_queue.run_repeating(cache_persist, conf.CACHE['persist_interval_sec'], context=updater)
+    job_queue.run_repeating(exchange_rates_refresh, conf.FX['refresh_interval_sec'], context=updater)
+    precompute_at = datetime.strptime(conf.JOBS['precompute_reference_prices']['time'], '%H:%M').time().replace(
+            tzinfo=pytz.timezone(conf.LOCAL['tz']))
+    job_queue.run_daily(precompute_reference_prices, precompute_at, context=updater)
 
     bot_init(updater)
 
@@ -999,3 +1219,7 @@ def main() -> NoReturn:
     # SIGABRT. This should be used most of the time, since start_polling() is
     # non-blocking and will stop the bot gracefully.
     updater.idle()
+
+    # Persist the caches a last time on shutdown.
+    symbol_cache.dump()
+    render_pool.shutdown()
@@ -1,49 +1,42 @@
-from datetime import datetime
-from typing import Union, List
+from typing import List
 
+import numpy as np
 import pandas as pd
-import yfinance as yf
 
 from stonks_bot import conf
-from stonks_bot.dataclasses.currency_exchange import CurrencyExchange
+from stonks_bot.exchange_rates import exchange_rates
 
 
 class Currency(object):
-    store: dict = dict()
+    """Converts prices to the local currency. The rates are served by the shared exchange rate matrix."""
     currency_local: str = conf.LOCAL['currency']
 
     def get_exchange_rate(self, symbol: str) -> float:
-        rate_store = self._retrieve_exchange_rate_from_store(symbol)
+        return exchange_rates.rate(symbol, self.currency_local)
 
-        # Create the exchange rate if it is not already in store.
-        if not rate_store:
-            result = self._fetch_exchange_rate(symbol)
-            ce = CurrencyExchange(symbol=symbol)
-            ce.rate = result
-            self.store[symbol] = ce
-        else:
-            result = rate_store
+    def get_exchange_rates(self, symbols: List[str]) -> dict:
+        return exchange_rates.rates(symbols, self.currency_local)
 
-        return result
-
-    def _retrieve_exchange_rate_from_store(self, symbol: str) -> Union[bool, float]:
-        result = False
-
-        # If it is not in store, false will be returned.
-        if symbol in self.store:
-            ce = self.store[symbol]
+    def convert_to_currency_df_asof(self, symbol: str, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """Converts every row at the exchange rate of its own date (as of join with the daily rate history)."""
+        index = df.index
+        # The wall time of the exchange is kept, so every bar keeps its trading date.
+        index = index.tz_localize(None) if index.tz is not None else index
+        rates = exchange_rates.rates_asof(symbol, self.currency_local, index.values.astype('datetime64[D]'))
+        df[columns] = df[columns].to_numpy(dtype=np.float64) * rates[:, None]
 
-            # Check if rate is up to date or needs to be updated
-            if ce.fetched_at.date() == datetime.now().date():
-                result = ce.rate
-            else:
-                result = ce.rate = self._fetch_exchange_rate(symbol)
-
-        return result
+        return df
 
-    def convert_to_currency_df(self, symbol: str, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
-        exc_rate = self.get_exchange_rate(symbol)
-        df[columns] = df[columns].mul(exc_rate)
+    def convert_to_currency_df_rows(self, df: pd.DataFrame, currency_column: str, columns: List[str],
+                                    currency_default: str) -> pd.DataFrame:
+        """Converts tables of mixed currencies: Every row is converted from the currency in its `currency_column`. All
+        rates are looked up at once and applied by one vectorized multiplication."""
+        currencies = df[currency_column].fillna(currency_default) if currency_column in df else \
+            pd.Series(currency_default, index=df.index)
+        codes, uniques = pd.factorize(currencies)
+        rates = self.get_exchange_rates(list(uniques))
+        factors = np.array([rates[c] for c in uniques], dtype=np.float64)[codes]
+        df[columns] = df[columns].to_numpy(dtype=np.float64) * factors[:, None]
 
         return df
 
@@ -55,14 +48,3 @@ class Currency(object):
             result[key] = item * exc_rate
 
         return result
-
-    def _fetch_exchange_rate(self, symbol: str) -> Union[float]:
-        yf_df = yf.download(tickers=f'{symbol}{self.currency_local}=X', period='1d', group_by='ticker')
-        adj_close = yf_df[conf.OHLC['adj_close']]
-
-        if len(adj_close) > 0:
-            rate = adj_close[0]
-        else:
-            rate = 1.0
-
-        return rate
@@ -0,0 +1,21 @@
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Union
+
+from dataclasses_json import dataclass_json
+
+
+@dataclass_json
+@dataclass
+class ChartImage:
+    symbol: str
+    period: str
+    interval: str
+    bar_last_at: int
+    image: bytes
+    file_id: Union[str, None] = None
+
+    @property
+    def photo(self) -> Union[str, BytesIO]:
+        # Already uploaded images are only referenced by their Telegram `file_id`.
+        return self.file_id if self.file_id else BytesIO(self.image)
@@ -0,0 +1,14 @@
+from dataclasses import dataclass
+from datetime import datetime, date
+
+from dataclasses_json import dataclass_json
+
+
+@dataclass_json
+@dataclass
+class IntradayState:
+    date: date
+    price_open: float
+    price_max: float
+    price_min: float
+    last_bar_at: datetime
@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from datetime import date
+
+from dataclasses_json import dataclass_json
+
+
+@dataclass_json
+@dataclass
+class ReferencePrices:
+    date: date
+    close_7d: float
+    close_30d: float
+    close_52w: float
+    close_ytd: float
+    price_52w_high: float
+    price_52w_low: float
@@ -0,0 +1,13 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from dataclasses_json import dataclass_json
+
+
+@dataclass_json
+@dataclass
+class RegistryEntry:
+    stonk: Any
+    ref_count: int = 0
+    registered_at: datetime = datetime.now()
@@ -2,6 +2,8 @@ import json
 import re
 from datetime import date, timedelta
 from io import BytesIO
+from typing import Callable
+from urllib.parse import urlparse
 
 import pandas as pd
 import requests
@@ -10,10 +12,12 @@ from bs4 import BeautifulSoup
 from yahoo_earnings_calendar import YahooEarningsCalendar
 
 from stonks_bot import conf, Currency
+from stonks_bot.helper.cache import StaleWhileRevalidateCache
 from stonks_bot.helper.exceptions import BackendDataNotFound
 from stonks_bot.helper.formatters import formatter_date, formatter_shorten_1, formatter_round_currency_scalar, \
     formatter_conditional_no_dec
 from stonks_bot.helper.plot import PlotContext
+from stonks_bot.helper.singleflight import SingleFlight
 from stonks_bot.helper.web import get_user_agent
 
 PERFORMANCE_SECTORS_SP500_TIMESPAN = {
@@ -39,6 +43,11 @@ class Discovery(object):
     ]
     currency_api: str = None
     currency: Currency = None
+    _flight: SingleFlight = SingleFlight('discovery')
+    # Rendered results keyed by (source URL, count), shared by all chats.
+    _responses: StaleWhileRevalidateCache = StaleWhileRevalidateCache(
+            'discovery_responses', stale_sec=conf.CACHE['discovery']['stale_sec'],
+            size_max=conf.CACHE['discovery']['size_max'])
 
     def __init__(self):
         self.currency_api = conf.API['finance_currency']
@@ -46,7 +55,7 @@ class Discovery(object):
 
     def performance_sectors_sp500(self, timespan: str = 'realtime') -> BytesIO:
         sp = SectorPerformances(key=conf.API['alphavantage_api_key'], output_format='pandas')
-        df_sectors, _ = sp.get_sector()
+        df_sectors, _ = self._flight.do('sectors', sp.get_sector)
         timespan_desc = PERFORMANCE_SECTORS_SP500_TIMESPAN[timespan]
         df_data = df_sectors[timespan_desc]
         title = f'S&P500 Sectors: {timespan_desc[8:]}'
@@ -74,32 +83,32 @@ class Discovery(object):
 
     def gainers(self, count: int = 15) -> str:
         url = f'https://finance.yahoo.com/gainers?offset=0&count={count}'
-        result = self.get_daily_performers(url)
+        result = self._cached(url, count, lambda: self.get_daily_performers(url))
 
         return result
 
     def losers(self, count: int = 15) -> str:
         url = f'https://finance.yahoo.com/losers?offset=0&count={count}'
-        result = self.get_daily_performers(url)
+        result = self._cached(url, count, lambda: self.get_daily_performers(url))
 
         return result
 
     def undervalued_large_caps(self, count: int = 15) -> str:
         url = f'https://finance.yahoo.com/screener/predefined/undervalued_large_caps?offset=0&count={count}'
-        result = self.get_daily_performers(url)
+        result = self._cached(url, count, lambda: self.get_daily_performers(url))
 
         return result
 
     def undervalued_growth(self, count: int = 15) -> str:
         url = f'https://finance.yahoo.com/screener/predefined/undervalued_growth_stocks?offset=0&count={count}'
-        result = self.get_daily_performers(url)
+        result = self._cached(url, count, lambda: self.get_daily_performers(url))
 
         return result
 
     def get_daily_performers(self, yf_url: str, convert_currency: bool = True) -> str:
-        resp = requests.get(yf_url, headers={'User-Agent': get_user_agent()})
+        text = self._get_text(yf_url)
         regex = r'root\.App\.main = .*}\(this\)\);'
-        matches = re.search(regex, resp.text, re.DOTALL)
+        matches = re.search(regex, text, re.DOTALL)
 
         if not matches:
             error_msg = 'Backend data not found. Please contact an administrator.'
@@ -109,22 +118,23 @@ class Discovery(object):
         json_str = matches.group(0).replace('\n', '').replace('\r', '').replace('root.App.main = ', '').replace(
                 ';}(this));', '')
         result = json.loads(json_str)
-        columns = ['Name', 'Symbol', 'Price (Intraday)', 'Change', '% Change']
+        columns = ['Name', 'Symbol', 'Price (Intraday)', 'Change', '% Change', 'Currency']
         df_data = list()
 
         for row in result['context']['dispatcher']['stores']['ScreenerResultsStore']['results']['rows']:
             df_data.append([
                 row['shortName'], row['symbol'], row['regularMarketPrice']['raw'], row['regularMarketChange']['raw'],
-                row['regularMarketChangePercent']['raw'],
+                row['regularMarketChangePercent']['raw'], row.get('currency', self.currency_api)
             ])
 
         df = pd.DataFrame(df_data, columns=columns)
 
         if convert_currency:
             columns_to_convert = [columns[2], columns[3]]
-            df = self.currency.convert_to_currency_df(self.currency_api, df, columns_to_convert)
+            # Screeners mix exchanges, so every row is converted from its own currency.
+            df = self.currency.convert_to_currency_df_rows(df, columns[5], columns_to_convert, self.currency_api)
 
-        result = df[columns].to_string(header=['Company', 'Sym', 'Price', '±', '%'],
+        result = df[columns[:5]].to_string(header=['Company', 'Sym', 'Price', '±', '%'],
                                        index=False, formatters={columns[0]: '{:.9}'.format,
                                                                 columns[2]: formatter_round_currency_scalar,
                                                                 columns[3]: formatter_round_currency_scalar,
@@ -134,7 +144,12 @@ class Discovery(object):
 
     def orders(self, count: int = 15) -> str:
         url = f'https://finance.yahoo.com/most-active?offset=0&count={count}'
-        df = pd.read_html(url)[0]
+        result = self._cached(url, count, lambda: self.get_orders(url))
+
+        return result
+
+    def get_orders(self, url: str) -> str:
+        df = self._flight.do(url, pd.read_html, url)[0]
         columns = ['Name', 'Symbol', 'Volume']
         result = df[columns].to_string(header=['Company', 'Sym', 'Volume'],
                                        index=False, formatters={columns[0]: '{:.15}'.format})
@@ -143,13 +158,13 @@ class Discovery(object):
 
     def high_short(self, count: int = 15) -> str:
         url = 'https://www.highshortinterest.com/'
-        result = self.get_short_float(url, count)
+        result = self._cached(url, count, lambda: self.get_short_float(url, count))
 
         return result
 
     def low_float(self, count: int = 15) -> str:
         url = 'https://www.lowfloat.com/'
-        result = self.get_short_float(url, count)
+        result = self._cached(url, count, lambda: self.get_short_float(url, count))
 
         return result
 
@@ -165,6 +180,15 @@ class Discovery(object):
 
     def hot_pennystocks(self, count: int = 15, convert_currency: bool = True) -> str:
         url = 'https://www.pennystockflow.com/'
+
+        if not convert_currency:
+            return self.get_hot_pennystocks(url, count, convert_currency)
+
+        result = self._cached(url, count, lambda: self.get_hot_pennystocks(url, count))
+
+        return result
+
+    def get_hot_pennystocks(self, url: str, count: int = 15, convert_currency: bool = True) -> str:
         df = self.get_short_float_penny(url)
         columns = ['Ticker', '# Trades', 'Price', 'Change']
         # Remove the $ symbol.
@@ -173,7 +197,8 @@ class Discovery(object):
 
         if convert_currency:
             columns_to_convert = [columns[2]]
-            df = self.currency.convert_to_currency_df(self.currency_api, df, columns_to_convert)
+            # The source has no currency column, thus all rows are converted from the API currency.
+            df = self.currency.convert_to_currency_df_rows(df, 'Currency', columns_to_convert, self.currency_api)
 
         result = df[columns].head(n=count).to_string(header=['Sym.', 'Trades', 'Price', '±%'], index=False,
                                                      formatters={columns[2]: formatter_round_currency_scalar,
@@ -182,7 +207,7 @@ class Discovery(object):
         return result
 
     def get_short_float_penny(self, url: str) -> pd.DataFrame:
-        soup_text = BeautifulSoup(requests.get(url, headers={'User-Agent': get_user_agent()}).text, 'lxml')
+        soup_text = BeautifulSoup(self._get_text(url), 'lxml')
 
         columns = list()
         for header_cell in soup_text.findAll('td', {'class': 'tblhdr'}):
@@ -209,3 +234,13 @@ class Discovery(object):
         df = pd.DataFrame(data, columns=columns)
 
         return df
+
+    def _get_text(self, url: str) -> str:
+        return self._flight.do(url, lambda: requests.get(url, headers={'User-Agent': get_user_agent()}).text)
+
+    def _cached(self, url: str, count: int, loader: Callable[[], str]) -> str:
+        """Serves results from the shared response cache. The TTL depends on the source (host) of `url`."""
+        ttls = conf.CACHE['discovery']['ttl_sec']
+        ttl_sec = ttls.get(urlparse(url).netloc, ttls['default'])
+
+        return self._responses.get((url, count), loader, ttl_sec)
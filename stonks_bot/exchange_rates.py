@@ -0,0 +1,198 @@
+from dataclasses import dataclass
+from datetime import date
+from threading import Lock
+from time import time
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+import yfinance as yf
+
+from stonks_bot import conf
+from stonks_bot.helper.data import yf_panel
+from stonks_bot.helper.singleflight import SingleFlight
+
+
+@dataclass(frozen=True)
+class RatesSnapshot:
+    base: str
+    # Currency -> value of one unit in the base currency.
+    rates: Mapping[str, float]
+    fetched_at: float
+
+    def rate(self, currency_from: str, currency_to: str) -> float:
+        # Cross rate via the base currency.
+        return self.rates[currency_from] / self.rates[currency_to]
+
+
+@dataclass(frozen=True)
+class RatesHistory:
+    currency: str
+    # Sorted daily dates (`datetime64[D]`) and the rates of one unit in the base currency at these dates.
+    dates: np.ndarray
+    rates: np.ndarray
+    fetched_at: float
+
+
+# Minor currency units, which are quoted by some exchanges (e.g. LSE in pence) -> (currency, factor).
+MINOR_UNITS = {
+    'GBp': ('GBP', 0.01),
+    'GBX': ('GBP', 0.01),
+    'ZAc': ('ZAR', 0.01),
+    'ILA': ('ILS', 0.01)
+}
+
+
+class ExchangeRates(object):
+    """Exchange rate matrix. Only the rates of every currency to one base currency are fetched (all pairs by one
+    batched download), every other pair is derived from them.
+
+    Readers take the current immutable snapshot without any lock. A refresh builds a new snapshot and replaces the
+    reference, so readers never see a half updated matrix. Only currencies, which were never seen before, are fetched
+    while reading; all known currencies are refreshed in the background (see `refresh`)."""
+    base: str = None
+
+    def __init__(self, base: str):
+        self.base = base
+        self._snapshot = RatesSnapshot(base=base, rates=MappingProxyType({base: 1.0}), fetched_at=0.)
+        self._currencies = {base}
+        # Serializes writers only.
+        self._lock = Lock()
+        self._flight = SingleFlight('currency')
+        # Currency -> `RatesHistory`; shared by all symbols of the same currency.
+        self._histories: Dict[str, RatesHistory] = {}
+
+    def rate(self, currency_from: str, currency_to: str) -> float:
+        return self.rates([currency_from], currency_to)[currency_from]
+
+    def rates(self, currencies: Iterable[str], currency_to: str) -> Dict[str, float]:
+        """Returns the rates of many currencies to `currency_to`. Missing currencies are fetched by one request."""
+        majors = {c: self._major(c) for c in set(currencies)}
+        major_to, factor_to = self._major(currency_to)
+        snapshot = self._snapshot
+        missing = [c for c in {m for m, _ in majors.values()} | {major_to} if c not in snapshot.rates]
+
+        if missing:
+            snapshot = self._add_currencies(missing)
+
+        return {c: snapshot.rate(major, major_to) * factor / factor_to for c, (major, factor) in majors.items()}
+
+    def rates_asof(self, currency_from: str, currency_to: str, dates: np.ndarray) -> np.ndarray:
+        """As of join of the daily rate history: Every date (`datetime64[D]`) gets the last known rate at or before it.
+        Dates before the history get its first rate. Today and dates after the history get the current rate, like the
+        current price does, so intraday changes do not contain the FX move since the last daily rate."""
+        today = np.datetime64(date.today(), 'D')
+        currency_from, factor_from = self._major(currency_from)
+        currency_to, factor_to = self._major(currency_to)
+        result = np.full(len(dates), factor_from / factor_to)
+
+        for currency, invert in ((currency_from, False), (currency_to, True)):
+            if currency == self.base:
+                continue
+
+            rh = self.history(currency)
+
+            if rh is None or len(rh.dates) == 0:
+                # No history at all, the current rate is better than nothing.
+                rates = np.full(len(dates), self.rate(currency, self.base))
+            else:
+                pos = np.searchsorted(rh.dates, dates, side='right') - 1
+                rates = rh.rates[np.clip(pos, 0, None)]
+                current = (dates >= today) | (dates > rh.dates[-1])
+
+                if current.any():
+                    rates = np.where(current, self.rate(currency, self.base), rates)
+
+            result = result / rates if invert else result * rates
+
+        return result
+
+    def history(self, currency: str) -> RatesHistory:
+        """Daily rates of `currency` to the base currency. They are fetched once and refreshed after
+        `conf.FX['history_ttl_sec']`."""
+        rh = self._histories.get(currency, None)
+
+        if rh is None or time() - rh.fetched_at > conf.FX['history_ttl_sec']:
+            rh = self._flight.do(('history', currency), self._fetch_history, currency)
+
+            with self._lock:
+                self._histories[currency] = rh
+
+        return rh
+
+    @staticmethod
+    def _major(currency: str) -> Tuple[str, float]:
+        """Returns the currency and the factor of one unit in it, e.g. `GBp` -> (`GBP`, 0.01)."""
+        return MINOR_UNITS.get(currency, (currency, 1.))
+
+    def refresh(self) -> RatesSnapshot:
+        """Fetches the rates of all known currencies by one batched request."""
+        with self._lock:
+            currencies = sorted(self._currencies)
+
+        rates = self._flight.do('refresh', self._fetch, currencies)
+
+        return self._publish(rates)
+
+    def _add_currencies(self, currencies: List[str]) -> RatesSnapshot:
+        currencies = sorted(currencies)
+
+        with self._lock:
+            self._currencies.update(currencies)
+
+        rates = self._flight.do(tuple(currencies), self._fetch, currencies)
+        # Like before, currencies without any rate are converted 1:1 instead of being fetched again on every read. The
+        # background refresh still tries to fetch them.
+        fallback = {c: 1.0 for c in currencies if c not in rates}
+
+        return self._publish({**fallback, **rates})
+
+    def _publish(self, rates: Dict[str, float]) -> RatesSnapshot:
+        with self._lock:
+            merged = dict(self._snapshot.rates)
+            merged.update(rates)
+            merged[self.base] = 1.0
+            self._snapshot = RatesSnapshot(base=self.base, rates=MappingProxyType(merged), fetched_at=time())
+
+            return self._snapshot
+
+    def _fetch(self, currencies: List[str]) -> Dict[str, float]:
+        pairs = {f'{c}{self.base}=X': c for c in currencies if c != self.base}
+
+        if len(pairs) == 0:
+            return {}
+
+        yf_df = yf.download(tickers=' '.join(pairs), period='5d', interval='1d', group_by='ticker', progress=False)
+        yf_df = yf_panel(yf_df, next(iter(pairs)))
+
+        rates = {}
+        tickers = set(yf_df.columns.get_level_values(0))
+
+        for pair, currency in pairs.items():
+            if pair not in tickers:
+                continue
+
+            close = yf_df[pair][conf.OHLC['adj_close']].dropna()
+
+            if len(close) > 0:
+                rates[currency] = float(close.iloc[-1])
+
+        return rates
+
+    def _fetch_history(self, currency: str) -> RatesHistory:
+        yf_df = yf.download(tickers=f'{currency}{self.base}=X', period=conf.FX['history_period'], interval='1d',
+                            progress=False)
+        close = yf_df[conf.OHLC['adj_close']].dropna() if len(yf_df) > 0 else yf_df
+
+        if len(close) == 0:
+            # Remembered as well, so unknown pairs are not fetched again before the TTL expired.
+            return RatesHistory(currency=currency, dates=np.array([], dtype='datetime64[D]'), rates=np.array([]),
+                                fetched_at=time())
+
+        index = close.index.tz_localize(None) if close.index.tz is not None else close.index
+
+        return RatesHistory(currency=currency, dates=index.values.astype('datetime64[D]'),
+                            rates=close.to_numpy(dtype=np.float64), fetched_at=time())
+
+
+exchange_rates = ExchangeRates(base=conf.FX['base'])
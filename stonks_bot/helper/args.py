@@ -1,8 +1,11 @@
+import csv
+import re
 from argparse import ArgumentParser
-from typing import Union, List, Any, Dict
+from typing import Union, List, Any, Dict, Tuple
 
 from telegram import Update
 
+from stonks_bot import conf
 from stonks_bot.helper.message import reply_gif_wrong_arg_help, reply_gif_symbol_missing
 
 parser_symbol = ArgumentParser(description='Symbol to lookup.')
@@ -21,6 +24,50 @@ def parse_symbols(update: Update, args: List[str]) -> Union[List[Union[None, str
     return result
 
 
+def parse_symbol_list(text: str) -> List[str]:
+    """Splits a pasted list of symbols (separated by whitespace, commas or semicolons). Symbols are upper cased and
+    duplicates are removed, the order is kept."""
+    symbols = [t.upper() for t in re.split(r'[\s,;]+', text) if t]
+
+    return list(dict.fromkeys(symbols))
+
+
+def parse_symbol_csv(text: str) -> List[str]:
+    """Takes the first column of every row, upper cased. A header row (e.g. `Symbol`) is skipped."""
+    symbols = []
+
+    try:
+        dialect = csv.Sniffer().sniff(text[:1024], delimiters=',;\t')
+    except csv.Error:
+        # A single column has no delimiter to detect.
+        dialect = csv.excel
+
+    for i, row in enumerate(csv.reader(text.splitlines(), dialect)):
+        if not row or not row[0].strip():
+            continue
+
+        cell = row[0].strip()
+
+        if i == 0 and cell.lower() in ('symbol', 'symbols', 'ticker', 'isin'):
+            continue
+
+        symbols.append(cell.upper())
+
+    return list(dict.fromkeys(symbols))
+
+
+def parse_chart(update: Update, args: List[str]) -> Tuple[List[Union[None, str]], str]:
+    """Parses `<SYMBOLs/ISINs> [<PERIOD>]`. The period is optional and only recognized as the last argument."""
+    periods = conf.CHART['periods']
+    period = '1d'
+
+    if args and args[-1].lower() in periods:
+        period = args[-1].lower()
+        args = args[:-1]
+
+    return parse_symbols(update, args), period
+
+
 parser_daily_perf_count = ArgumentParser(description='Daily performance count parser.')
 parser_daily_perf_count.add_argument('count', nargs='?', default=15, type=int, help='How many rows to show?')
 
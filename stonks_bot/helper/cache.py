@@ -0,0 +1,182 @@
+import logging
+import os
+import pickle
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, RLock
+from time import time
+from typing import Any, Callable, Hashable, Union
+
+from stonks_bot.helper.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache(object):
+    """Thread safe LRU cache with a time to live per entry. It can be persisted to a pickle file to survive restarts."""
+    ttl_sec: int = 3600
+    size_max: int = 1024
+    filename: Union[str, None] = None
+
+    def __init__(self, ttl_sec: int = 3600, size_max: int = 1024, filename: Union[str, None] = None):
+        self.ttl_sec = ttl_sec
+        self.size_max = size_max
+        self.filename = filename
+        # key -> (expires_at, value)
+        self._data = OrderedDict()
+        self._lock = RLock()
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, None) is not None
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, None)
+
+            if item is None:
+                return default
+
+            expires_at, value = item
+
+            if expires_at < time():
+                del self._data[key]
+                self._dirty = True
+
+                return default
+
+            self._data.move_to_end(key)
+
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl_sec: Union[int, None] = None) -> None:
+        ttl_sec = self.ttl_sec if ttl_sec is None else ttl_sec
+
+        with self._lock:
+            self._data[key] = (time() + ttl_sec, value)
+            self._data.move_to_end(key)
+            self._dirty = True
+
+            while len(self._data) > self.size_max:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, None)
+
+            if item is None:
+                return default
+
+            self._dirty = True
+
+            return item[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._dirty = True
+
+    def purge_expired(self) -> None:
+        now = time()
+
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._data.items() if expires_at < now]:
+                del self._data[key]
+                self._dirty = True
+
+    def load(self) -> bool:
+        if not self.filename or not os.path.isfile(self.filename):
+            return False
+
+        try:
+            with open(self.filename, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logger.error(msg=f'Cache file "{self.filename}" could not be loaded.', exc_info=e)
+
+            return False
+
+        with self._lock:
+            self._data = OrderedDict(data)
+            self._dirty = False
+
+        self.purge_expired()
+
+        return True
+
+    def dump(self) -> bool:
+        if not self.filename or not self._dirty:
+            return False
+
+        self.purge_expired()
+
+        with self._lock:
+            data = list(self._data.items())
+            self._dirty = False
+
+        # Write to a temporary file first, so a crash cannot leave a corrupted cache behind.
+        filename_tmp = f'{self.filename}.tmp'
+
+        with open(filename_tmp, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(filename_tmp, self.filename)
+
+        return True
+
+
+class StaleWhileRevalidateCache(object):
+    """Cache of loaded values with stale while revalidate: Fresh values are returned as they are. Stale values (older
+    than their TTL, but younger than TTL + `stale_sec`) are returned immediately as well, while they are loaded again in
+    the background. Only missing or too old values are loaded by the caller; concurrent loads of a key are coalesced."""
+    _executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache_revalidate')
+    stale_sec: int = None
+
+    def __init__(self, name: str, stale_sec: int = 600, size_max: int = 1024):
+        self.stale_sec = stale_sec
+        # key -> (fresh_until, value); entries expire when they are too old to be served stale.
+        self._cache = TTLCache(size_max=size_max)
+        self._flight = SingleFlight(name)
+        self._refreshing = set()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any], ttl_sec: int) -> Any:
+        item = self._cache.get(key, None)
+
+        if item is None:
+            return self._flight.do(key, self._load, key, loader, ttl_sec)
+
+        fresh_until, value = item
+
+        if fresh_until < time():
+            self._revalidate(key, loader, ttl_sec)
+
+        return value
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], ttl_sec: int) -> Any:
+        value = loader()
+        self._cache.set(key, (time() + ttl_sec, value), ttl_sec=ttl_sec + self.stale_sec)
+
+        return value
+
+    def _revalidate(self, key: Hashable, loader: Callable[[], Any], ttl_sec: int) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+
+            self._refreshing.add(key)
+
+        self._executor.submit(self._revalidate_run, key, loader, ttl_sec)
+
+    def _revalidate_run(self, key: Hashable, loader: Callable[[], Any], ttl_sec: int) -> None:
+        try:
+            self._flight.do(key, self._load, key, loader, ttl_sec)
+        except Exception as e:
+            # The stale value is served until it expires; the next request tries again.
+            logger.error(msg=f'Cache entry "{key}" could not be revalidated.', exc_info=e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
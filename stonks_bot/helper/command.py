@@ -76,15 +76,23 @@ def restricted_add(func_error_handler: Callable, error_message: str) -> Union[Ca
     return decorator
 
 
+def get_symbols_remaining(update: Update, context: CallbackContext) -> Union[int, None]:
+    """Count of symbols, which can still be added to the watch list of the chat. `None` means unlimited (admins)."""
+    if update.effective_user.id in conf.USER_ID['admins']:
+        return None
+
+    len_stonks = len(context.chat_data.get(conf.INTERNALS['stock'], {}))
+    symbols_max = conf.LIMITS['default'][update.effective_chat.type]['symbols_max']
+
+    return max(0, symbols_max - len_stonks)
+
+
 def check_symbol_limit(func: Callable) -> Union[Callable, bool]:
     @wraps(func)
     def wrapped(update: Update, context: CallbackContext, *args, **kwargs):
-        len_stonks = len(context.chat_data.get(conf.INTERNALS['stock'], {}))
-        chat_type = update.effective_chat.type
-        symbols_max = conf.LIMITS['default'][chat_type]['symbols_max']
-        user_id = update.effective_user.id
+        symbols_max = conf.LIMITS['default'][update.effective_chat.type]['symbols_max']
 
-        if len_stonks >= symbols_max and user_id not in conf.USER_ID['admins']:
+        if get_symbols_remaining(update, context) == 0:
             reply = f'❌ You are only allowed to watch {symbols_max} symbol(s). Please delete symbols from the watch ' \
                     f'list first.'
             update.message.reply_text(reply)
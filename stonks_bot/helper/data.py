@@ -1,5 +1,71 @@
+import re
 from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
 
 
 def factory_defaultdict():
     return defaultdict(factory_defaultdict)
+
+
+def period_to_timedelta(period: str) -> timedelta:
+    """Converts a yfinance period string (e.g. `5d`, `1mo`, `1y`, `ytd`, `max`) to a timedelta."""
+    if period == 'ytd':
+        now = datetime.now()
+
+        return now - datetime(now.year, 1, 1)
+    elif period == 'max':
+        return timedelta(days=365 * 100)
+
+    match = re.fullmatch(r'(\d+)(mo|d|wk|y)', period)
+
+    if not match:
+        raise ValueError(f'Period "{period}" is not supported.')
+
+    count = int(match.group(1))
+    unit = match.group(2)
+    days = {'d': 1, 'wk': 7, 'mo': 31, 'y': 366}[unit]
+
+    return timedelta(days=count * days)
+
+
+def yf_start(start: datetime) -> datetime:
+    """yfinance interprets naive datetimes in the local system time, so timezone aware datetimes are converted to it.
+    Naive datetimes are passed unchanged."""
+    if start.tzinfo is None:
+        return start
+
+    return start.astimezone().replace(tzinfo=None)
+
+
+def yf_panel(yf_df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """Returns a download of `group_by='ticker'` with the column levels (ticker, field). A single ticker is returned
+    by yfinance without the ticker column level, `ticker` is used for it then."""
+    if isinstance(yf_df.columns, pd.MultiIndex):
+        return yf_df
+
+    return pd.concat({ticker: yf_df}, axis=1)
+
+
+def resample_ohlcv(ohlc: pd.DataFrame, count_max: int) -> pd.DataFrame:
+    """Aggregates consecutive bars, so at most `count_max` candles are left: First open, max. high, min. low, last close
+    and summed volume. Bars are grouped by position, thus non trading times do not create empty candles."""
+    count = len(ohlc)
+
+    if count <= count_max:
+        return ohlc
+
+    step = -(-count // count_max)
+    starts = np.arange(0, count, step)
+    ends = np.append(starts[1:], count) - 1
+    result = pd.DataFrame({
+        'Open': ohlc.Open.to_numpy(dtype=np.float64)[starts],
+        'High': np.fmax.reduceat(ohlc.High.to_numpy(dtype=np.float64), starts),
+        'Low': np.fmin.reduceat(ohlc.Low.to_numpy(dtype=np.float64), starts),
+        'Close': ohlc.Close.to_numpy(dtype=np.float64)[ends],
+        'Volume': np.add.reduceat(np.nan_to_num(ohlc.Volume.to_numpy(dtype=np.float64)), starts)
+    }, index=ohlc.index[starts])
+
+    return result
@@ -4,3 +4,11 @@ class InvalidSymbol(Exception):
 
 class BackendDataNotFound(Exception):
     pass
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+class UnsupportedQuoteType(Exception):
+    pass
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, List
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def fan_out(func: Callable[[Any], Any], items: Iterable[Any], workers: int, deadline_sec: float) -> List[Any]:
+    """Calls `func` for every item with at most `workers` calls at the same time. Returns the results in the order of
+    `items`. Failed calls do not abort the others: Their exception is returned instead of the result. Calls, which did
+    not finish within `deadline_sec`, return `DeadlineExceeded`."""
+    items = list(items)
+
+    if len(items) == 0:
+        return []
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(items))))
+    futures = [executor.submit(func, item) for item in items]
+    wait(futures, timeout=deadline_sec)
+    # Do not wait for late calls; they finish in the background and their results are dropped.
+    executor.shutdown(wait=False)
+    results = []
+
+    for f in futures:
+        if not f.done():
+            f.cancel()
+            results.append(DeadlineExceeded(f'No result within {deadline_sec} s.'))
+
+            continue
+
+        try:
+            results.append(f.result())
+        except Exception as e:
+            results.append(e)
+
+    return results
@@ -71,7 +71,10 @@ def formatter_brackets(val: Union[str, int, float]) -> str:
 
 class TelegramEncoder(JSONEncoder):
     def default(self, o):
-        return o.to_dict()
+        if hasattr(o, 'to_dict'):
+            return o.to_dict()
+
+        return str(o)
 
 
 def text_pre(text):
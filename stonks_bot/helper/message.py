@@ -1,25 +1,75 @@
 from typing import Any, List, Union
 
-from telegram import Update, ParseMode
+from telegram import Update, ParseMode, Message, InputMediaPhoto
 from telegram.ext import CallbackContext
 
 from stonks_bot import conf
 from stonks_bot.helper.formatters import text_pre
 from stonks_bot.helper.media import gif_random
 
+# Telegram allows 2 - 10 photos per album.
+MEDIA_GROUP_SIZE_MAX = 10
+
 
 def reply_with_photo(update: Update, photo: Any, caption: str = '', pre: bool = False,
-                     parse_mode: ParseMode = ParseMode.HTML) -> None:
+                     parse_mode: ParseMode = ParseMode.HTML) -> Message:
     caption = caption if not pre else text_pre(caption)
 
-    update.effective_message.reply_photo(photo, quote=True, caption=caption, parse_mode=parse_mode)
+    return update.effective_message.reply_photo(photo, quote=True, caption=caption, parse_mode=parse_mode)
 
 
 def send_photo(context: CallbackContext, chat_id: int, photo: Any, caption: str = '', pre: bool = False,
-               parse_mode: ParseMode = ParseMode.HTML) -> None:
+               parse_mode: ParseMode = ParseMode.HTML) -> Message:
     caption = caption if not pre else text_pre(caption)
 
-    context.bot.send_photo(chat_id=chat_id, photo=photo, caption=caption, parse_mode=parse_mode)
+    return context.bot.send_photo(chat_id=chat_id, photo=photo, caption=caption, parse_mode=parse_mode)
+
+
+def reply_with_media_group(update: Update, photos: List[Any], caption: str = '', pre: bool = False,
+                           parse_mode: ParseMode = ParseMode.HTML) -> List[Message]:
+    """Replies with albums of up to 10 photos. The caption is shown below the first album. Returns one message per
+    photo in the given order."""
+    result = []
+
+    for i, chunk in enumerate(chunk_media_group(photos)):
+        caption_chunk = caption if i == 0 else ''
+
+        if len(chunk) == 1:
+            result.append(reply_with_photo(update, chunk[0], caption=caption_chunk, pre=pre, parse_mode=parse_mode))
+        else:
+            media = media_group_photos(chunk, caption_chunk, pre, parse_mode)
+            result.extend(update.effective_message.reply_media_group(media, quote=True))
+
+    return result
+
+
+def send_media_group(context: CallbackContext, chat_id: int, photos: List[Any], caption: str = '', pre: bool = False,
+                     parse_mode: ParseMode = ParseMode.HTML) -> List[Message]:
+    result = []
+
+    for i, chunk in enumerate(chunk_media_group(photos)):
+        caption_chunk = caption if i == 0 else ''
+
+        if len(chunk) == 1:
+            result.append(send_photo(context, chat_id, chunk[0], caption=caption_chunk, pre=pre, parse_mode=parse_mode))
+        else:
+            media = media_group_photos(chunk, caption_chunk, pre, parse_mode)
+            result.extend(context.bot.send_media_group(chat_id=chat_id, media=media))
+
+    return result
+
+
+def chunk_media_group(photos: List[Any]) -> List[List[Any]]:
+    return [photos[i:i + MEDIA_GROUP_SIZE_MAX] for i in range(0, len(photos), MEDIA_GROUP_SIZE_MAX)]
+
+
+def media_group_photos(photos: List[Any], caption: str, pre: bool, parse_mode: ParseMode) -> List[InputMediaPhoto]:
+    caption = caption if not pre or not caption else text_pre(caption)
+    # Telegram shows the caption of the first photo as caption of the whole album.
+    media = [InputMediaPhoto(photo, caption=caption if i == 0 else None, parse_mode=parse_mode)
+             for i, photo in enumerate(photos)]
+
+    return media
 
 
 def reply_random_gif(update: Update, search_term) -> None:
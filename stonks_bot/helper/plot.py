@@ -1,18 +1,94 @@
 from io import BytesIO
+from typing import Union
 
-import matplotlib.pyplot as plt
 import mplfinance as mpf
 import numpy as np
 import pandas as pd
-from matplotlib.ticker import MultipleLocator
+from matplotlib.artist import Artist, allow_rasterization
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
+from matplotlib.text import Text
+from matplotlib.ticker import MultipleLocator, FuncFormatter
+from matplotlib.transforms import ScaledTranslation
+from PIL import Image
 
 from stonks_bot import conf
 
+STYLE_DARK = {
+    'background': '#000000',
+    'foreground': '#FFFFFF',
+    'figsize': (8, 5.75),
+    # Fixed margins (fraction of the figure) of candle charts, if the profile has no tight bounding box.
+    'margins': {'left': 0.11, 'right': 0.97, 'bottom': 0.13, 'top': 0.87, 'hspace': 0.08}
+}
+
+# Built once and reused by every chart.
+STYLE_CANDLE = {
+    'colors': to_rgba_array(['#FE7074', '#94ED9C']),  # down, up
+    'width_body': 0.6,
+    'width_wick': 0.8,
+    'alpha_volume': 0.8,
+    'grid': {'color': '#A0A0A0', 'linestyle': '--', 'linewidth': 0.5, 'alpha': 0.4},
+    'mplfinance': mpf.make_mpf_style(base_mpf_style='nightclouds',
+                                     marketcolors=mpf.make_marketcolors(up='#94ED9C', down='#FE7074', inherit=True))
+}
+
+# Upper bound of percent labels per candle chart, so dense charts stay readable and cheap to draw.
+LABELS_PERCENT_MAX = 48
+
+
+class TextBatch(Artist):
+    """Draws many labels as one artist. A single `Text` is moved to every label position while drawing, instead of
+    adding one `Text` artist per label to the axes."""
+
+    def __init__(self, ax: Axes, x: np.ndarray, y: np.ndarray, labels: np.ndarray, above: np.ndarray,
+                 pad_pt: float = 5, **kwargs):
+        super().__init__()
+        self._x = x
+        self._y = y
+        self._labels = labels
+        self._above = above
+        # Labels above the bar are shifted up, labels below are shifted down by `pad_pt` points.
+        self._transform_above = ax.transData + ScaledTranslation(0, pad_pt / 72, ax.figure.dpi_scale_trans)
+        self._transform_below = ax.transData + ScaledTranslation(0, -pad_pt / 72, ax.figure.dpi_scale_trans)
+        self._text = Text(**kwargs)
+        self._text.set_figure(ax.figure)
+
+    @allow_rasterization
+    def draw(self, renderer) -> None:
+        if not self.get_visible():
+            return
+
+        text = self._text
+
+        for x, y, label, above in zip(self._x, self._y, self._labels, self._above):
+            text.set_transform(self._transform_above if above else self._transform_below)
+            text.set_verticalalignment('bottom' if above else 'top')
+            text.set_position((x, y))
+            text.set_text(label)
+            text.draw(renderer)
+
+        self.stale = False
+
 
 class PlotContext(object):
-    def __enter__(self):
-        self._chart_prepare()
+    """Every context renders on its own `Figure` with an Agg canvas. The global `pyplot` state machine is not used at
+    all, thus charts can be rendered from many threads at the same time.
 
+    Candles are drawn directly as collections (`direct`) by default; `mplfinance` is kept as fallback renderer. The
+    output format, resolution and bounding box are set by an output profile (see `conf.CHART['profiles']`)."""
+    fig: Figure = None
+    renderer: str = None
+    profile: dict = None
+
+    def __init__(self, renderer: Union[str, None] = None, profile: Union[str, None] = None):
+        self.renderer = renderer if renderer else conf.CHART['renderer']
+        self.profile = conf.CHART['profiles'][profile if profile else conf.CHART['profile']]
+
+    def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, exc_traceback):
@@ -43,71 +119,198 @@ class PlotContext(object):
                 ax.text(idx, i['max'] + text_pad, 'H', verticalalignment='top', **kwargs)
 
     def _add_labels_candle_percent(self, ax, ohlc: pd.DataFrame) -> None:
-        transform = ax.transData.inverted()
-        # show the text 10 pixels above/below the bar
-        text_pad = transform.transform((0, 10))[1] - transform.transform((0, 0))[1]
-        percentages = 100. * (ohlc.Close - ohlc.Open) / ohlc.Open
+        price_open = ohlc.Open.to_numpy(dtype=np.float64)
+        price_close = ohlc.Close.to_numpy(dtype=np.float64)
+        percentages = np.round(100. * (price_close - price_open) / price_open, 1)
+        idx = self._thin_labels(percentages, LABELS_PERCENT_MAX)
+        above = price_open[idx] < price_close[idx]
+        # Unchanged bars (and missing prices) are not labeled.
+        keep = above | (price_open[idx] > price_close[idx])
+        idx, above = idx[keep], above[keep]
+        y = np.where(above, ohlc.High.to_numpy(dtype=np.float64)[idx], ohlc.Low.to_numpy(dtype=np.float64)[idx])
+        labels = np.char.mod('%.1f', percentages[idx])
+
+        ax.add_artist(TextBatch(ax, idx, y, labels, above, pad_pt=5, horizontalalignment='center', color='#FFFFFF'))
+
+    @staticmethod
+    def _thin_labels(values: np.ndarray, count_max: int) -> np.ndarray:
+        """Returns the positions of the labels to show. If there are more bars than `count_max`, the bars are split into
+        equal windows and only the largest absolute value of each window is kept."""
+        count = len(values)
+
+        if count <= count_max:
+            return np.arange(count)
+
+        step = -(-count // count_max)
+        windows = -(-count // step)
+        padded = np.zeros(windows * step)
+        padded[:count] = np.abs(np.nan_to_num(values))
+        idx = padded.reshape(windows, step).argmax(axis=1) + np.arange(windows) * step
+
+        return idx[idx < count]
 
-        kwargs = dict(horizontalalignment='center', color='#FFFFFF')
+    def create_candle_chart(self, ohlc: pd.DataFrame, stock_name: str, symbol: str, period: str = '1d') -> BytesIO:
+        intraday = period == '1d'
+        fig = self._chart_prepare()
+        ax, ax_volume = fig.subplots(2, 1, sharex=True, gridspec_kw={'height_ratios': [3, 1]})
+        datetime_format = '%H:%M' if intraday else '%d.%m.%y'
 
-        for i, (idx, val) in enumerate(percentages.items()):
-            row = ohlc.loc[idx]
-            price_open = row.Open
-            price_close = row.Close
-            if price_open < price_close:
-                ax.text(i, row.High + text_pad, np.round(val, 1), verticalalignment='bottom', **kwargs)
-            elif price_open > price_close:
-                ax.text(i, row.Low - text_pad, np.round(val, 1), verticalalignment='top', **kwargs)
+        if self.renderer == 'mplfinance':
+            self._draw_candles_mplfinance(ax, ax_volume, ohlc, datetime_format)
+        else:
+            self._draw_candles_direct(ax, ax_volume, ohlc, datetime_format)
 
-    def create_candle_chart(self, ohlc: pd.DataFrame, stock_name: str, symbol: str) -> BytesIO:
-        mc = mpf.make_marketcolors(up='#94ED9C', down='#FE7074', inherit=True)
-        s = mpf.make_mpf_style(base_mpf_style='nightclouds', marketcolors=mc)
+        date_range = f'{ohlc.index[0].date()}' if intraday else f'{ohlc.index[0].date()} - {ohlc.index[-1].date()}'
+        fig.suptitle(f"{stock_name} ({symbol}): {date_range}", color=STYLE_DARK['foreground'])
+        self._apply_style(ax, ax_volume)
+        # Around 16 ticks, but at least every 4th candle.
+        ax.xaxis.set_major_locator(MultipleLocator(max(4, -(-len(ohlc) // 16))))
+        self._add_labels_candle_high_low(ax, ohlc)
+        self._add_labels_candle_percent(ax, ohlc)
 
-        fig, axlist = mpf.plot(
+        if self.profile['bbox'] != 'tight':
+            # Fixed margins save the extra layout pass of the tight bounding box. Other charts keep their own layout.
+            fig.subplots_adjust(**STYLE_DARK['margins'])
+
+        return self._save_to_buffer()
+
+    def _draw_candles_direct(self, ax: Axes, ax_volume: Axes, ohlc: pd.DataFrame, datetime_format: str) -> None:
+        """Draws all candles with two collections and the volume with one. Candle `i` is drawn at x = `i`, like
+        `mplfinance` does, so non trading times leave no gaps."""
+        count = len(ohlc)
+        x = np.arange(count, dtype=np.float64)
+        price_open = ohlc.Open.to_numpy(dtype=np.float64)
+        price_close = ohlc.Close.to_numpy(dtype=np.float64)
+        price_high = ohlc.High.to_numpy(dtype=np.float64)
+        price_low = ohlc.Low.to_numpy(dtype=np.float64)
+        volume = np.nan_to_num(ohlc.Volume.to_numpy(dtype=np.float64))
+        colors = STYLE_CANDLE['colors'][(price_close >= price_open).astype(np.intp)]
+        half = STYLE_CANDLE['width_body'] / 2
+        x_left = x - half
+        x_right = x + half
+        body_bottom = np.fmin(price_open, price_close)
+        body_top = np.fmax(price_open, price_close)
+        wicks = np.stack((np.column_stack((x, price_low)), np.column_stack((x, price_high))), axis=1)
+        bodies = np.stack((np.column_stack((x_left, body_bottom)), np.column_stack((x_left, body_top)),
+                           np.column_stack((x_right, body_top)), np.column_stack((x_right, body_bottom))), axis=1)
+        bars_volume = np.stack((np.column_stack((x_left, np.zeros(count))), np.column_stack((x_left, volume)),
+                                np.column_stack((x_right, volume)), np.column_stack((x_right, np.zeros(count)))),
+                               axis=1)
+
+        ax.add_collection(LineCollection(wicks, colors=colors, linewidths=STYLE_CANDLE['width_wick']))
+        ax.add_collection(PolyCollection(bodies, facecolors=colors, edgecolors=colors, linewidths=0.5))
+        ax_volume.add_collection(PolyCollection(bars_volume, facecolors=colors, edgecolors=colors, linewidths=0.5,
+                                                alpha=STYLE_CANDLE['alpha_volume']))
+        ax.autoscale_view()
+        ax_volume.autoscale_view()
+        ax.set_xlim(-1, count)
+        ax_volume.set_ylim(bottom=0)
+
+        labels = np.asarray(ohlc.index.strftime(datetime_format))
+        ax_volume.xaxis.set_major_formatter(
+                FuncFormatter(lambda val, pos: labels[int(round(val))] if 0 <= round(val) < count else ''))
+        # Rotated like `mplfinance` does, otherwise date labels overlap.
+        ax_volume.tick_params(axis='x', labelrotation=45)
+
+        for a in (ax, ax_volume):
+            a.grid(**STYLE_CANDLE['grid'])
+
+        ax.set_title(f"Time Zone is {conf.LOCAL['tz']}.")
+        ax.set_ylabel(f"Price ({conf.LOCAL['currency']})")
+        ax_volume.set_ylabel('Volume')
+
+    def _draw_candles_mplfinance(self, ax: Axes, ax_volume: Axes, ohlc: pd.DataFrame, datetime_format: str) -> None:
+        # External axes mode: mplfinance draws on the given axes and does not touch `pyplot`.
+        mpf.plot(
                 ohlc,
+                ax=ax,
+                volume=ax_volume,
                 type='candle',
-                style=s,
-                title=f"{stock_name} ({symbol}): {ohlc.index[0].date()}",
+                style=STYLE_CANDLE['mplfinance'],
                 ylabel=f"Price ({conf.LOCAL['currency']})",
-                volume=True,
                 ylabel_lower='Volume',
-                returnfig=True,
-                block=True,
                 tz_localize=True,
                 axtitle=f"Time Zone is {conf.LOCAL['tz']}.",
-                datetime_format='%H:%M'
+                datetime_format=datetime_format
         )
 
-        axlist[0].xaxis.set_major_locator(MultipleLocator(4))
-        self._add_labels_candle_high_low(axlist[0], ohlc)
-        self._add_labels_candle_percent(axlist[0], ohlc)
+    def create_bar_chart(self, bar_data: pd.DataFrame, title: str, ylabel: str) -> BytesIO:
+        fig = self._chart_prepare()
+        ax = fig.add_subplot(1, 1, 1)
+        bar_data.plot(kind='bar', ax=ax)
+
+        ax.set_title(title)
+        ax.set_ylabel(ylabel)
+        ax.grid()
+        self._apply_style(ax)
+        fig.tight_layout()
 
         return self._save_to_buffer()
 
-    def create_bar_chart(self, bar_data: pd.DataFrame, title: str, ylabel: str) -> BytesIO:
-        bar_data.plot(kind='bar')
+    def _apply_style(self, *axes: Axes) -> None:
+        fg = STYLE_DARK['foreground']
+        self.fig.set_facecolor(STYLE_DARK['background'])
 
-        plt.title(title)
-        plt.ylabel(ylabel)
-        plt.tight_layout()
-        plt.grid()
+        for ax in axes:
+            ax.set_facecolor(STYLE_DARK['background'])
+            ax.tick_params(colors=fg, which='both')
+            ax.xaxis.label.set_color(fg)
+            ax.yaxis.label.set_color(fg)
+            ax.title.set_color(fg)
 
-        return self._save_to_buffer()
+            for spine in ax.spines.values():
+                spine.set_color(fg)
+
+    def _chart_prepare(self) -> Figure:
+        self.fig = Figure(figsize=STYLE_DARK['figsize'])
+        FigureCanvasAgg(self.fig)
 
-    def _chart_prepare(self):
-        plt.close('all')
-        plt.style.use('dark_background')
+        return self.fig
 
     def _chart_finalize(self):
-        plt.cla()
-        plt.clf()
-        plt.close()
-        plt.close('all')
+        if self.fig:
+            self.fig.clear()
+            self.fig = None
 
     def _save_to_buffer(self) -> BytesIO:
         buf = BytesIO()
+        profile = self.profile
+        tight = profile['bbox'] == 'tight'
+        facecolor = self.fig.get_facecolor()
+
+        if profile['format'] == 'png' and not profile.get('colors'):
+            self.fig.savefig(buf, format='png', dpi=profile['dpi'], bbox_inches='tight' if tight else None,
+                             facecolor=facecolor)
+        else:
+            self._encode_image(self._render_image(tight, facecolor), buf)
 
-        plt.savefig(buf, bbox_inches='tight')
         buf.seek(0)
 
         return buf
+
+    def _render_image(self, tight: bool, facecolor) -> Image.Image:
+        if tight:
+            buf = BytesIO()
+            self.fig.savefig(buf, format='png', dpi=self.profile['dpi'], bbox_inches='tight', facecolor=facecolor)
+            buf.seek(0)
+
+            return Image.open(buf).convert('RGB')
+
+        self.fig.set_dpi(self.profile['dpi'])
+        self.fig.canvas.draw()
+
+        return Image.fromarray(np.asarray(self.fig.canvas.buffer_rgba())).convert('RGB')
+
+    def _encode_image(self, image: Image.Image, buf: BytesIO) -> None:
+        profile = self.profile
+
+        if profile['format'] == 'png':
+            # Charts use few colors, thus a palette shrinks the PNG a lot without visible loss.
+            image = image.quantize(colors=profile['colors'], method=Image.FASTOCTREE)
+            image.save(buf, format='PNG', compress_level=profile.get('compress_level', 6))
+        elif profile['format'] == 'webp':
+            image.save(buf, format='WEBP', quality=profile.get('quality', 80), method=profile.get('method', 4))
+        elif profile['format'] == 'jpeg':
+            image.save(buf, format='JPEG', quality=profile.get('quality', 80), optimize=True)
+        else:
+            raise ValueError(f"Output format \"{profile['format']}\" is not supported.")
@@ -0,0 +1,96 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from threading import Lock, BoundedSemaphore
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from stonks_bot import conf
+from stonks_bot.helper.exceptions import RenderQueueFull
+
+COLUMNS_CHART = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def render_candle_chart(index: np.ndarray, tz: Union[str, None], ohlcv: np.ndarray, stock_name: str, symbol: str,
+                        period: str = '1d') -> bytes:
+    """Runs inside the worker processes. Rebuilds the OHLC frame from plain arrays and returns the image bytes."""
+    # Imported here, so the plotting libraries are only loaded inside the worker processes.
+    from stonks_bot.helper.plot import PlotContext
+
+    dt_index = pd.DatetimeIndex(index.view('datetime64[ns]'))
+    dt_index = dt_index.tz_localize('UTC').tz_convert(tz) if tz else dt_index
+    ohlc = pd.DataFrame(ohlcv.T, index=dt_index, columns=COLUMNS_CHART)
+
+    with PlotContext() as pc:
+        buf = pc.create_candle_chart(ohlc, stock_name, symbol, period)
+
+    return buf.getvalue()
+
+
+class RenderPool(object):
+    """Renders charts in a pool of worker processes, so charts are rendered in parallel on all cores and a slow render
+    does not block the bot process. The amount of waiting jobs is bounded and workers are recycled after a number of
+    jobs to keep leaking plotting state and memory in check."""
+    workers: int = None
+    queue_size: int = None
+    tasks_per_executor: int = None
+    timeout_sec: int = None
+
+    def __init__(self, workers: Union[int, None] = None, queue_size: int = 64, tasks_per_executor: int = 200,
+                 timeout_sec: int = 60):
+        self.workers = workers if workers else multiprocessing.cpu_count()
+        self.queue_size = queue_size
+        self.tasks_per_executor = tasks_per_executor
+        self.timeout_sec = timeout_sec
+        self._executor = None
+        self._tasks_count = 0
+        self._lock = Lock()
+        self._slots = BoundedSemaphore(self.workers + queue_size)
+
+    def render_candle_chart(self, ohlc: pd.DataFrame, stock_name: str, symbol: str, period: str = '1d') -> BytesIO:
+        tz = str(ohlc.index.tz) if ohlc.index.tz is not None else None
+        index = np.asarray(ohlc.index.asi8, dtype=np.int64)
+        ohlcv = np.ascontiguousarray(ohlc[COLUMNS_CHART].to_numpy(dtype=np.float64).T)
+        image = self._run(render_candle_chart, index, tz, ohlcv, stock_name, symbol, period)
+
+        return BytesIO(image)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _run(self, func, *args) -> bytes:
+        if not self._slots.acquire(timeout=self.timeout_sec):
+            raise RenderQueueFull('Too many charts are waiting to be rendered.')
+
+        try:
+            future = self._get_executor().submit(func, *args)
+
+            return future.result(timeout=self.timeout_sec)
+        finally:
+            self._slots.release()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._tasks_count >= self.tasks_per_executor:
+                if self._executor:
+                    # Running jobs are finished by the old workers, before they exit.
+                    self._executor.shutdown(wait=False)
+
+                # Forking a process with many threads is unsafe, so the workers are spawned.
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                self._tasks_count = 0
+
+            self._tasks_count += 1
+
+            return self._executor
+
+
+render_pool = RenderPool(workers=conf.RENDER['workers'], queue_size=conf.RENDER['queue_size'],
+                         tasks_per_executor=conf.RENDER['tasks_per_executor'],
+                         timeout_sec=conf.RENDER['timeout_sec'])
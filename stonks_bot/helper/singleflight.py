@@ -0,0 +1,79 @@
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Hashable, List
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Coalesces concurrent identical calls: While a call for a key is in flight, further callers of the same key wait
+    for it and share its result (or its exception) instead of calling the backend again. Nothing is cached after the
+    call has finished."""
+    groups: List['SingleFlight'] = []
+    _groups_lock: Lock = Lock()
+    name: str = None
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.count_calls = 0
+        self.count_executed = 0
+        self.count_coalesced = 0
+
+        with self._groups_lock:
+            self.groups.append(self)
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self.count_calls += 1
+            call = self._calls.get(key, None)
+
+            if call:
+                self.count_coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.count_executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+
+            if call.error:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+            call.done.set()
+
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'calls': self.count_calls,
+                'executed': self.count_executed,
+                'coalesced': self.count_coalesced,
+                'in_flight': len(self._calls)
+            }
+
+    @classmethod
+    def stats_all(cls) -> Dict[str, Dict[str, int]]:
+        with cls._groups_lock:
+            return {g.name: g.stats() for g in cls.groups}
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict, Union
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from stonks_bot import conf, Currency
+from stonks_bot.bar_store import LOOKBACK_DAYS_MAX
+from stonks_bot.dataclasses.price_daily import PriceDaily
+from stonks_bot.helper.data import yf_panel, yf_start
+from stonks_bot.helper.math import round_currency_scalar
+from stonks_bot.stonk import Stonk
+
+COLUMNS_PRICE = ['Open', 'High', 'Low', 'Close', 'Adj Close']
+# Incremental intraday downloads are grouped by their start, floored to this frequency.
+INTRADAY_START_BUCKET = '15min'
+
+
+class Market(object):
+    """Batched (multi symbol) access to market data. All symbols are fetched by one multi ticker download per chunk
+    instead of one download per symbol."""
+    currency: Currency = None
+
+    def __init__(self):
+        self.currency = Currency()
+
+    def download(self, symbols: List[str], period: str = '1d', interval: str = '1d', prepost: bool = True,
+                 start: Union[datetime, None] = None) -> pd.DataFrame:
+        """Returns a panel with the column levels (symbol, field), regardless of the symbol count. If `start` is given,
+        only the bars since then are fetched instead of the whole `period`."""
+        chunk_size = conf.MARKET['download_chunk_size']
+        timespan = {'start': yf_start(start)} if start else {'period': period}
+        panels = []
+
+        for i in range(0, len(symbols), chunk_size):
+            chunk = symbols[i:i + chunk_size]
+            yf_df = yf.download(tickers=' '.join(chunk), interval=interval, group_by='ticker', prepost=prepost,
+                                progress=False, **timespan)
+
+            panels.append(yf_panel(yf_df, chunk[0]))
+
+        if len(panels) == 0:
+            return pd.DataFrame(columns=pd.MultiIndex.from_arrays([[], []]))
+
+        return pd.concat(panels, axis=1) if len(panels) > 1 else panels[0]
+
+    def convert_to_local_currency_panel(self, panel: pd.DataFrame) -> pd.DataFrame:
+        """Converts all price columns of a (symbol, field) panel to the local currency. One exchange rate is looked up
+        per source currency and the whole panel is scaled in one vectorized multiplication."""
+        symbols = panel.columns.get_level_values(0)
+        fields = panel.columns.get_level_values(1)
+        currencies = [Stonk.get_currency_api(s) for s in symbols]
+        rates = self.currency.get_exchange_rates(currencies)
+        factors = np.array([rates.get(c, 1.0) if f in COLUMNS_PRICE else 1.0 for c, f in zip(currencies, fields)])
+
+        return panel.mul(factors, axis=1)
+
+    def convert_to_local_time_panel(self, panel: pd.DataFrame) -> pd.DataFrame:
+        if panel.index.tzinfo is not None and panel.index.tzinfo.utcoffset(panel.index) is not None:
+            panel.index = panel.index.tz_convert(conf.LOCAL['tz'])
+
+        return panel
+
+    def get_financials_adjusted(self, symbols: List[str], period: str = '1d', interval: str = '1d',
+                                prepost: bool = True, start: Union[datetime, None] = None) -> pd.DataFrame:
+        panel = self.download(symbols, period=period, interval=interval, prepost=prepost, start=start)
+        panel = self.convert_to_local_currency_panel(panel)
+        panel = self.convert_to_local_time_panel(panel)
+
+        return panel
+
+    @staticmethod
+    def get_symbol_frame(panel: pd.DataFrame, symbol: str) -> pd.DataFrame:
+        if symbol not in panel.columns.get_level_values(0):
+            return pd.DataFrame(columns=COLUMNS_PRICE + ['Volume'])
+
+        # Different exchanges yield different index rows, so only the valid rows of this symbol are used.
+        return panel[symbol].dropna(how='all')
+
+    def intraday_bars(self, stonks: List[Stonk]) -> Dict[str, pd.DataFrame]:
+        """Fetches the 1m bars for the intraday accumulators of the given stonks. Stonks without a state (or a state
+        older than the 1m lookback) get the whole day, all others only the bars since their last seen bar. A new
+        trading day is detected by `Stonk.update_intraday`."""
+        lookback_min = pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=LOOKBACK_DAYS_MAX['1m'])
+        stonks_fresh = [s for s in stonks if s.intraday is None or s.intraday.last_bar_at < lookback_min]
+        # Stonks with a similar last seen bar share one download, so one illiquid stonk does not make all others
+        # download its older bars again.
+        stonks_incremental = defaultdict(list)
+        result = {}
+
+        for s in stonks:
+            if s not in stonks_fresh:
+                start = pd.Timestamp(s.intraday.last_bar_at).floor(INTRADAY_START_BUCKET).to_pydatetime()
+                stonks_incremental[start].append(s)
+
+        if len(stonks_fresh) > 0:
+            panel = self.get_financials_adjusted([s.symbol for s in stonks_fresh], period='1d', interval='1m')
+
+            for s in stonks_fresh:
+                result[s.symbol] = self.get_symbol_frame(panel, s.symbol)
+
+        for start, stonks_group in stonks_incremental.items():
+            panel = self.get_financials_adjusted([s.symbol for s in stonks_group], interval='1m', start=start)
+
+            for s in stonks_group:
+                result[s.symbol] = self.get_symbol_frame(panel, s.symbol)
+
+        return result
+
+    def price_daily(self, symbols: List[str]) -> Dict[str, PriceDaily]:
+        panel = self.get_financials_adjusted(symbols, period='1d', interval='1d', prepost=True)
+        result = {}
+
+        for symbol in symbols:
+            yf_df = self.get_symbol_frame(panel, symbol)
+
+            if len(yf_df) == 0:
+                continue
+
+            row = yf_df.iloc[-1]
+            result[symbol] = PriceDaily(open=round_currency_scalar(row.Open),
+                                        high=round_currency_scalar(row.High),
+                                        low=round_currency_scalar(row.Low),
+                                        close=round_currency_scalar(row.Close))
+
+        return result
@@ -0,0 +1,72 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+import requests
+
+from stonks_bot import conf
+from stonks_bot.helper.web import get_user_agent
+
+# Quote API field -> result column.
+QUOTE_FIELDS = {
+    'longName': 'name_long',
+    'shortName': 'name_short',
+    'quoteType': 'quote_type',
+    'currency': 'currency',
+    'regularMarketPrice': 'price_regular',
+    'preMarketPrice': 'price_pre_market',
+    'regularMarketVolume': 'volume',
+    'fiftyTwoWeekHigh': 'price_52w_high',
+    'fiftyTwoWeekLow': 'price_52w_low',
+    'fiftyTwoWeekChangePercent': 'percent_change_52w',
+    'averageAnalystRating': 'recommendation',
+    'earningsTimestamp': 'earnings_timestamp'
+}
+
+
+class Quote(object):
+    """Client for the Yahoo quote API. Fetches the quotes of many symbols per request instead of the heavy per symbol
+    `info` payload."""
+    url: str = 'https://query1.finance.yahoo.com/v7/finance/quote'
+    chunk_size: int = None
+
+    def __init__(self):
+        self.chunk_size = conf.QUOTE['chunk_size']
+        self._req_session = requests.Session()
+        self._req_session.headers.update({'User-Agent': get_user_agent()})
+
+    def fetch(self, symbols: List[str]) -> pd.DataFrame:
+        """Returns one row per found symbol (index) and one column per field. Symbols, which could not be found, are
+        missing in the result."""
+        columns = {column: [] for column in QUOTE_FIELDS.values()}
+        index = []
+
+        for i in range(0, len(symbols), self.chunk_size):
+            chunk = symbols[i:i + self.chunk_size]
+            params = {'symbols': ','.join(chunk), 'fields': ','.join(QUOTE_FIELDS.keys())}
+            r = self._req_session.get(self.url, params=params)
+            data = r.json()
+
+            for q in data['quoteResponse']['result']:
+                index.append(q['symbol'])
+
+                for field, column in QUOTE_FIELDS.items():
+                    columns[column].append(q.get(field, np.nan))
+
+        df = pd.DataFrame(columns, index=pd.Index(index, name='symbol'))
+        df['name'] = df['name_long'].fillna(df['name_short'])
+        # Pre-market prices take precedence, if there are any.
+        df['price'] = df['price_pre_market'].fillna(df['price_regular'])
+        df['percent_change_52w'] = df['percent_change_52w'] / 100
+        df['recommendation'] = df['recommendation'].map(self._parse_recommendation)
+        df['earnings_at'] = pd.to_datetime(df['earnings_timestamp'], unit='s', errors='coerce')
+
+        return df
+
+    @staticmethod
+    def _parse_recommendation(rating: str) -> str:
+        # E.g. `2.1 - Buy` -> `buy`.
+        if not isinstance(rating, str) or ' - ' not in rating:
+            return np.nan
+
+        return rating.split(' - ', 1)[1].strip().lower().replace(' ', '_')
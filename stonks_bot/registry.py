@@ -0,0 +1,99 @@
+import logging
+from datetime import datetime
+from threading import RLock
+from typing import Dict, List, Union, Tuple
+
+from stonks_bot import conf
+from stonks_bot.dataclasses.registry_entry import RegistryEntry
+from stonks_bot.stonk import Stonk
+
+logger = logging.getLogger(__name__)
+
+
+class StonkRegistry(object):
+    """Process wide store of one canonical `Stonk` per symbol, kept in `bot_data`. Chats only keep the symbol keys and
+    reference the registry entries, so every symbol is held and computed only once."""
+    _lock: RLock = RLock()
+    bot_data: dict = None
+
+    def __init__(self, bot_data: dict):
+        self.bot_data = bot_data
+
+    @property
+    def entries(self) -> Dict[str, RegistryEntry]:
+        return self.bot_data.setdefault(conf.INTERNALS['stock_registry'], {})
+
+    def get(self, symbol: str) -> Union[Stonk, None]:
+        entry = self.entries.get(symbol, None)
+
+        return entry.stonk if entry else None
+
+    def items(self) -> List[Tuple[str, Stonk]]:
+        with self._lock:
+            return [(symbol, entry.stonk) for symbol, entry in self.entries.items()]
+
+    def acquire(self, stonk: Stonk) -> Stonk:
+        with self._lock:
+            entry = self.entries.get(stonk.symbol, None)
+
+            if not entry:
+                entry = RegistryEntry(stonk=stonk, registered_at=datetime.now())
+                self.entries[stonk.symbol] = entry
+
+            entry.ref_count += 1
+
+            return entry.stonk
+
+    def release(self, symbol: str) -> None:
+        with self._lock:
+            entry = self.entries.get(symbol, None)
+
+            if not entry:
+                return
+
+            entry.ref_count -= 1
+
+            if entry.ref_count <= 0:
+                self.entries.pop(symbol, None)
+
+    def release_all(self, symbols: List[str]) -> None:
+        for symbol in symbols:
+            self.release(symbol)
+
+    def sync(self, chat_data: dict) -> None:
+        """Rebuilds the reference counts from all chat watch lists. Chats, which still hold full `Stonk` objects (old
+        data structure), are migrated to plain symbol keys."""
+        with self._lock:
+            entries_old = self.entries
+            entries_new = {}
+
+            for c_id, cd in chat_data.items():
+                stonks = cd.get(conf.INTERNALS['stock'], {})
+
+                for symbol in list(stonks.keys()):
+                    value = stonks[symbol]
+                    entry = entries_new.get(symbol, None)
+
+                    if not entry:
+                        if isinstance(value, Stonk):
+                            stonk = value
+                        elif symbol in entries_old:
+                            stonk = entries_old[symbol].stonk
+                        else:
+                            # The entry got lost, so it is rebuilt. The watch list of the chat is never touched here.
+                            try:
+                                stonk = Stonk(symbol)
+                            except Exception as e:
+                                logger.error(msg=f'Registry entry of "{symbol}" could not be rebuilt.', exc_info=e)
+
+                                continue
+
+                        entry = RegistryEntry(stonk=stonk, registered_at=datetime.now())
+                        entries_new[symbol] = entry
+
+                    if isinstance(value, Stonk):
+                        stonks[symbol] = value.added_at
+
+                    entry.ref_count += 1
+
+            self.bot_data[conf.INTERNALS['stock_registry']] = entries_new
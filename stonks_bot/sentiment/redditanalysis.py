@@ -16,6 +16,7 @@ from stonks_bot import conf, Currency
 from stonks_bot.config import Config
 from stonks_bot.helper.formatters import formatter_round_currency_scalar, formatter_date, formatter_conditional_no_dec
 from stonks_bot.helper.message import reply_message, reply_random_gif
+from stonks_bot.quote import Quote
 
 
 class RedditAnalysis(object):
@@ -143,7 +144,8 @@ class RedditAnalysis(object):
     def popular_symbols(self, days: int = 1, limit: int = 30, convert_currency: bool = True) -> str:
         subs = ['pennystocks', 'Daytrading', 'StockMarket', 'stocks', 'investing', 'wallstreetbets',
                 'mauerstrassenwetten']
-        columns = ['Company', 'Symbol', 'Mentions', 'Price', '% 1mo.', 'Earnings Date', 'Earnings Days Left']
+        columns = ['Company', 'Symbol', 'Mentions', 'Price', '% 1mo.', 'Earnings Date', 'Earnings Days Left',
+                   'Currency']
         data = []
         timestamp_after = int((datetime.today() - timedelta(days=days)).timestamp())
         psaw_api = PushshiftAPI()
@@ -182,38 +184,38 @@ class RedditAnalysis(object):
                                   group_by='ticker')
             tickers_not_existing = list(yf.shared._ERRORS.keys())
             tickers_existing = [t for t in tickers_clean if t not in tickers_not_existing]
-            tickers = yf.Tickers(' '.join(tickers_existing))
+            # Names and earning dates of all symbols are fetched batched.
+            quotes = Quote().fetch(tickers_existing)
 
             for symbol in tickers_existing:
-                try:
-                    t = getattr(tickers.tickers, symbol)
-                    t_info = t.info
-                except:
+                if symbol not in quotes.index:
                     continue
 
+                q = quotes.loc[symbol]
                 earnings_date = None
                 earnings_days_left = None
 
-                if t.calendar is not None:
-                    if len(t.calendar.T) > 0:
-                        earnings_date = t.calendar.iloc[:, 0]['Earnings Date']
-                        earnings_days_left = (earnings_date - now).days
+                if not pd.isna(q['earnings_at']):
+                    earnings_date = q['earnings_at']
+                    earnings_days_left = (earnings_date - now).days
 
                 price = history[symbol]['Close'][-1]
                 perf_1mo = (price / history[symbol]['Open'][0]) - 1
-                # TODO: Refactor with stonk.py (extract method or something like this).
-                name = t_info.get('longName', t_info.get('shortName', t_info.get('name', 'ERROR_IN_NAME_RETRIEVAL')))
+                name = q['name'] if not pd.isna(q['name']) else 'ERROR_IN_NAME_RETRIEVAL'
+
+                currency = q['currency'] if not pd.isna(q['currency']) else self.currency_api
 
-                data.append([name, symbol, tickers_stats[symbol], price, perf_1mo, earnings_date, earnings_days_left])
+                data.append([name, symbol, tickers_stats[symbol], price, perf_1mo, earnings_date, earnings_days_left,
+                             currency])
 
             df = pd.DataFrame(data, columns=columns)
 
             if convert_currency:
                 columns_to_convert = [columns[3]]
-                df = self.currency.convert_to_currency_df(self.currency_api, df, columns_to_convert)
+                df = self.currency.convert_to_currency_df_rows(df, columns[7], columns_to_convert, self.currency_api)
 
             df = df.sort_values(by=columns[2], ascending=False)
-            result = df[columns[:-1]].to_string(header=['Company', 'Sym', '#', 'Price', '% 1mo', 'Earn.📅'],
+            result = df[columns[:6]].to_string(header=['Company', 'Sym', '#', 'Price', '% 1mo', 'Earn.📅'],
                                                 index=False, formatters={columns[0]: '{:.9}'.format,
                                                                          columns[3]: formatter_round_currency_scalar,
                                                                          columns[4]: formatter_conditional_no_dec,
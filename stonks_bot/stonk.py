@@ -1,6 +1,5 @@
 from datetime import datetime, timedelta
-from io import BytesIO
-from typing import Union
+from typing import Union, Tuple, List
 
 import pandas as pd
 import requests
@@ -8,32 +7,48 @@ import yfinance as yf
 from si_prefix import si_format
 from tabulate import tabulate, simple_separated_format
 
-from stonks_bot import conf, Currency
+from stonks_bot import conf, Currency, symbol_cache
+from stonks_bot.bar_store import BarStore
+from stonks_bot.dataclasses.chart_image import ChartImage
+from stonks_bot.dataclasses.intraday_state import IntradayState
 from stonks_bot.dataclasses.performance import Performance
-from stonks_bot.dataclasses.price_daily import PriceDaily
+from stonks_bot.dataclasses.reference_prices import ReferencePrices
 from stonks_bot.dataclasses.stonk_details import StonkDetails
-from stonks_bot.helper.exceptions import InvalidSymbol
+from stonks_bot.helper.cache import TTLCache
+from stonks_bot.helper.data import resample_ohlcv
+from stonks_bot.helper.exceptions import InvalidSymbol, BackendDataNotFound, UnsupportedQuoteType
 from stonks_bot.helper.math import round_currency_scalar, change_percent, round_percent, get_last_value_times_series
-from stonks_bot.helper.plot import PlotContext
+from stonks_bot.helper.render import render_pool
+from stonks_bot.helper.singleflight import SingleFlight
+from stonks_bot.quote import Quote
 
 
 class Stonk(object):
     supported_quote_type = ['EQUITY', 'CRYPTOCURRENCY']
     symbol: str = None
     is_valid: bool = False
-    name: str = None
-    isin: str = None
     currency_api: str = None
     added_at: datetime = datetime.now()
-    daily_rise: Performance = Performance()
-    daily_fall: Performance = Performance()
-    recommendation: str = None
-    current_price: float = None
-    percent_change_52w: float = None
-    volume: int = None
-    price_52w_high: float = None
-    price_52w_low: float = None
-    market_capitalization: float = None
+    daily_rise: Performance = None
+    daily_fall: Performance = None
+    intraday: IntradayState = None
+    _reference_prices_cache: TTLCache = TTLCache(ttl_sec=conf.CACHE['reference_prices']['ttl_sec'],
+                                                 size_max=conf.CACHE['reference_prices']['size_max'])
+    # Identical backend calls of concurrent commands and jobs share one request.
+    _flight: SingleFlight = SingleFlight('stonk')
+    _chart_cache: TTLCache = TTLCache(ttl_sec=conf.CACHE['chart']['ttl_sec'], size_max=conf.CACHE['chart']['size_max'])
+    # The following fields are loaded lazily on first access and memoized afterwards. Thus, every command only pays
+    # for the data it actually reads.
+    _name: str = None
+    _isin: str = None
+    _info_loaded: bool = False
+    _recommendation: str = None
+    _current_price: float = None
+    _percent_change_52w: float = None
+    _volume: int = None
+    _price_52w_high: float = None
+    _price_52w_low: float = None
+    _market_capitalization: float = None
 
     def __init__(self, symbol: str) -> None:
         # Set global requests settings
@@ -56,64 +71,161 @@ class Stonk(object):
 
         if self.is_valid:
             self._set_currency(self.symbol)
-            yf_ticker = yf.Ticker(self.symbol)
-            self._populate_data(yf_ticker)
+            self.daily_rise = Performance()
+            self.daily_fall = Performance()
 
-    def _set_currency(self, symbol: str) -> None:
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            self._set_name()
+
+        return self._name
+
+    @property
+    def isin(self) -> str:
+        if self._isin is None:
+            self._set_isin()
+
+        return self._isin
+
+    @property
+    def recommendation(self) -> str:
+        self._load_info_data()
+
+        return self._recommendation
+
+    @property
+    def current_price(self) -> float:
+        self._load_info_data()
+
+        return self._current_price
+
+    @property
+    def percent_change_52w(self) -> float:
+        self._load_info_data()
+
+        return self._percent_change_52w
+
+    @percent_change_52w.setter
+    def percent_change_52w(self, v: float) -> None:
+        self._percent_change_52w = v
+
+    @property
+    def volume(self) -> int:
+        self._load_info_data()
+
+        return self._volume
+
+    @property
+    def price_52w_high(self) -> float:
+        self._load_info_data()
+
+        return self._price_52w_high
+
+    @property
+    def price_52w_low(self) -> float:
+        self._load_info_data()
+
+        return self._price_52w_low
+
+    @property
+    def market_capitalization(self) -> float:
+        self._load_info_data()
+
+        return self._market_capitalization
+
+    @staticmethod
+    def get_currency_api(symbol: str) -> str:
         symbol_split = symbol.split('-')
 
         if len(symbol_split) > 1:
-            self.currency_api = symbol_split[-1]
+            result = symbol_split[-1]
         else:
-            self.currency_api = conf.API['finance_currency']
+            result = conf.API['finance_currency']
+
+        return result
+
+    def _set_currency(self, symbol: str) -> None:
+        self.currency_api = self.get_currency_api(symbol)
 
     def _symbol_validate(self, symbol: str) -> None:
-        symbol_result = self._symbol_search(symbol)
+        quote = self._symbol_search(symbol)
+
+        if quote:
+            quote_type = quote.get('quote_type', None)
+
+            # The quote type is already known from the search, so unsupported symbols are rejected without loading
+            # the info data.
+            if quote_type and quote_type not in self.supported_quote_type:
+                raise UnsupportedQuoteType(
+                        f'"{quote["symbol"]}" is "quoteType" == "{quote_type}". This "quoteType" is not implemented, '
+                        f'yet.')
 
-        if symbol_result:
             self.is_valid = True
-            self.symbol = symbol_result
+            self.symbol = quote['symbol']
+            self._name = quote.get('name', None)
         else:
             raise InvalidSymbol()
 
-    def _set_name(self, yf_ticker: yf.Ticker) -> None:
-        self.name = yf_ticker.info.get('longName', yf_ticker.info.get('shortName',
-                                                                      yf_ticker.info.get('name',
-                                                                                         'ERROR_IN_NAME_RETRIEVAL')))
+    def _set_name(self) -> None:
+        self._load_info_data()
+
+        if self._name is None:
+            self._name = 'ERROR_IN_NAME_RETRIEVAL'
 
-    def _populate_data(self, yf_ticker: yf.Ticker) -> None:
-        self._set_name(yf_ticker)
-        self._set_isin(yf_ticker)
-        self._set_info_data(yf_ticker)
+    def _set_isin(self) -> None:
+        self._isin = self._flight.do(('isin', self.symbol), lambda: yf.Ticker(self.symbol).get_isin())
 
-    def _set_isin(self, yf_ticker: yf.Ticker) -> None:
-        self.isin = yf_ticker.get_isin()
+    def _load_info_data(self) -> None:
+        if not self._info_loaded:
+            quotes = self._flight.do(('quote', self.symbol), lambda: Quote().fetch([self.symbol]))
 
-    def _set_info_data(self, yf_ticker: yf.Ticker) -> None:
-        info = yf_ticker.get_info()
+            if self.symbol not in quotes.index:
+                raise BackendDataNotFound(f'No quote found for "{self.symbol}".')
 
+            self._set_quote_data(quotes.loc[self.symbol])
+
+    @staticmethod
+    def load_info_data_batch(stonks: List['Stonk']) -> None:
+        """Loads the info data of many stonks with batched quote requests instead of one request per stonk."""
+        stonks = [s for s in stonks if not s._info_loaded]
+
+        if len(stonks) == 0:
+            return
+
+        quotes = Quote().fetch([s.symbol for s in stonks])
+
+        for s in stonks:
+            if s.symbol in quotes.index:
+                s._set_quote_data(quotes.loc[s.symbol])
+
+    def _set_quote_data(self, quote: pd.Series) -> None:
         # Check if this is an equity. If not, raise error, since only equity is implemented.
-        if not info['quoteType'] in self.supported_quote_type:
-            raise Exception(
-                    f'"{self.symbol}" is "quoteType" == "{info["quoteType"]}". This "quoteType" is not implemented, '
+        if not quote['quote_type'] in self.supported_quote_type:
+            raise UnsupportedQuoteType(
+                    f'"{self.symbol}" is "quoteType" == "{quote["quote_type"]}". This "quoteType" is not implemented, '
                     f'yet.')
 
-        self.recommendation = info['recommendationKey'] if 'recommendationKey' in info else 'N/A'
-        self.volume = info['volume']
+        if self._name is None and not pd.isna(quote['name']):
+            self._name = quote['name']
+
+        self._recommendation = quote['recommendation'] if not pd.isna(quote['recommendation']) else 'N/A'
+        self._volume = quote['volume']
         prices_to_convert = {
-            'current_price': info['preMarketPrice'] if info['preMarketPrice'] else info['regularMarketPrice'],
-            'price_52w_high': info['fiftyTwoWeekHigh'],
-            'price_52w_low': info['fiftyTwoWeekLow']
+            'current_price': quote['price'],
+            'price_52w_high': quote['price_52w_high'],
+            'price_52w_low': quote['price_52w_low']
         }
 
-        if info['quoteType'] == 'EQUITY':
-            self.percent_change_52w = info['52WeekChange']
+        if quote['quote_type'] == 'EQUITY' and not pd.isna(quote['percent_change_52w']):
+            self._percent_change_52w = quote['percent_change_52w']
 
         prices_converted = self._convert_to_local_currency(prices_to_convert)
-        self.current_price = prices_converted['current_price']
-        self.price_52w_high = prices_converted['price_52w_high']
-        self.price_52w_low = prices_converted['price_52w_low']
-        self.market_capitalization = self.volume * self.current_price
+        self._current_price = prices_converted['current_price']
+        self._price_52w_high = prices_converted['price_52w_high']
+        self._price_52w_low = prices_converted['price_52w_low']
+        self._market_capitalization = self._volume * self._current_price
+        self._info_loaded = True
 
     def _convert_to_local_currency(self, values: dict) -> dict:
         result = values
@@ -129,27 +241,52 @@ class Stonk(object):
         c = Currency()
 
         if self.currency_api != c.currency_local:
-            result = c.convert_to_currency_df(self.currency_api, result, ['Open', 'High', 'Low', 'Close', 'Adj Close'])
+            # The bars might be read-only views of the bar store, so the conversion works on a copy. Every bar is
+            # converted at the rate of its own date, thus long periods (52w, YTD) are not skewed by today's rate.
+            result = c.convert_to_currency_df_asof(self.currency_api, result.copy(),
+                                                   ['Open', 'High', 'Low', 'Close', 'Adj Close'])
 
         return result
 
-    def _symbol_search(self, needle: str) -> Union[str, bool]:
+    def _symbol_search(self, needle: str) -> Union[dict, bool]:
+        needle_key = needle.strip().upper()
+        quote = symbol_cache.get(needle_key, None)
+
+        if quote is None:
+            quote = self._flight.do(('search', needle_key), self._symbol_search_remote, needle)
+
+            if quote:
+                symbol_cache.set(needle_key, quote)
+                symbol_cache.set(quote['symbol'].upper(), quote)
+            else:
+                # Negative cache: Invalid input is not looked up again until the (shorter) TTL expires.
+                symbol_cache.set(needle_key, False, ttl_sec=conf.CACHE['symbol_search']['ttl_negative_sec'])
+
+        return quote
+
+    def _symbol_search_remote(self, needle: str) -> Union[dict, bool]:
         url = "https://query2.finance.yahoo.com/v1/finance/search"
         params = {'q': needle, 'quotesCount': 1, 'newsCount': 0}
         r = self._req_session.get(url, params=params)
         data = r.json()
 
-        symbol = False
+        quote = False
 
         if len(data['quotes']) > 0:
-            symbol = data['quotes'][0]['symbol']
+            q = data['quotes'][0]
+            quote = {
+                'symbol': q['symbol'],
+                'name': q.get('longname', q.get('shortname', None)),
+                'quote_type': q.get('quoteType', None)
+            }
 
-        return symbol
+        return quote
 
     def _financial_download(self, period: str = '1d', interval: str = '15m') -> pd.DataFrame:
-        yf_df = yf.download(tickers=self.symbol, period=period, interval=interval, group_by='ticker', prepost=True)
+        yf_df = self._flight.do(('bars', self.symbol, period, interval), BarStore().get, self.symbol, period, interval)
 
-        return yf_df
+        # Coalesced callers share the result, so every caller gets its own frame (the data is not copied).
+        return yf_df.copy(deep=False)
 
     def _convert_to_local_time(self, yf_df):
         try:
@@ -167,28 +304,73 @@ class Stonk(object):
 
         return yf_df
 
-    def chart(self) -> BytesIO:
-        yf_df = self._get_financials_adjusted('1d', '15m')
-        with PlotContext() as pc:
-            chart_buf = pc.create_candle_chart(yf_df, self.name, self.symbol)
+    def chart(self, period: str = '1d', interval: Union[str, None] = None,
+              yf_df: Union[pd.DataFrame, None] = None) -> ChartImage:
+        """Already fetched bars of the given `period` and `interval` can be passed by `yf_df`."""
+        interval = interval if interval else conf.CHART['periods'][period]
+
+        if yf_df is None:
+            yf_df = self._get_financials_adjusted(period, interval)
+
+        bar_last_at = int(yf_df.index[-1].value) if len(yf_df) > 0 else 0
+        key = (self.symbol, period, interval, bar_last_at)
+        # Charts are only rendered again, if there is a new bar.
+        ci = self._chart_cache.get(key, None)
+
+        if ci is None:
+            # Long periods are resampled to a bounded count of candles, thus render cost does not grow with the period.
+            ohlc = resample_ohlcv(yf_df, conf.CHART['candles_max'])
+            chart_buf = render_pool.render_candle_chart(ohlc, self.name, self.symbol, period)
+            ci = ChartImage(symbol=self.symbol, period=period, interval=interval, bar_last_at=bar_last_at,
+                            image=chart_buf.getvalue())
+            self._chart_cache.set(key, ci)
 
-        return chart_buf
+        return ci
 
-    def price_daily(self) -> PriceDaily:
-        yf_df = self._get_financials_adjusted('1d', '1d')
-        pd = PriceDaily(open=round_currency_scalar(yf_df.Open[0]),
-                        high=round_currency_scalar(yf_df.High[0]),
-                        low=round_currency_scalar(yf_df.Low[0]),
-                        close=round_currency_scalar(yf_df.Close[0]))
+    def update_intraday(self, yf_df: pd.DataFrame) -> Union[IntradayState, None]:
+        """Updates the intraday accumulator with the given 1m bars. Only bars since the last seen bar are taken into
+        account, thus the frame may contain only the new tail of the trading day."""
+        state = self.intraday
 
-        return pd
+        if len(yf_df) == 0:
+            return state
 
-    def calculate_perf_rise_fall_daily(self) -> bool:
-        yf_df = self._get_financials_adjusted(period='1d', interval='1m')
-        price_date = yf_df.index[0].date()
-        price_open = yf_df.Open[0]
-        price_max = yf_df.Close.max()
-        price_min = yf_df.Open.min()
+        date_last = yf_df.index[-1].date()
+
+        if state is None or state.date != date_last:
+            yf_df = yf_df[yf_df.index.date == date_last]
+            state = IntradayState(date=date_last, price_open=yf_df.Open[0], price_max=yf_df.Close.max(),
+                                  price_min=yf_df.Open.min(), last_bar_at=yf_df.index[-1].to_pydatetime())
+        else:
+            # The last seen bar is included again, since it might not have been completed at the last update.
+            yf_df = yf_df[yf_df.index >= state.last_bar_at]
+
+            if len(yf_df) > 0:
+                state.price_max = max(state.price_max, yf_df.Close.max())
+                state.price_min = min(state.price_min, yf_df.Open.min())
+                state.last_bar_at = yf_df.index[-1].to_pydatetime()
+
+        self.intraday = state
+
+        return state
+
+    def calculate_perf_rise_fall_daily(self, yf_df: Union[pd.DataFrame, None] = None) -> bool:
+        if yf_df is None:
+            yf_df = self._get_financials_adjusted(period='1d', interval='1m')
+
+        state = self.update_intraday(yf_df)
+
+        if state is None:
+            return False
+
+        if self.daily_rise is None or self.daily_fall is None:
+            self.daily_rise = Performance()
+            self.daily_fall = Performance()
+
+        price_date = state.date
+        price_open = state.price_open
+        price_max = state.price_max
+        price_min = state.price_min
         datetime_now = datetime.now()
         date_now = datetime_now.date()
 
@@ -212,39 +394,68 @@ class Stonk(object):
         else:
             return False
 
-    def upcoming_earning(self):
-        t = yf.Ticker(self.symbol)
-        result = False
+    def reference_prices(self) -> ReferencePrices:
+        """Returns the daily reference prices, which are calculated only once per day and symbol."""
+        rp = self._reference_prices_cache.get(self.symbol, None)
 
-        if t.calendar is not None:
-            result = t.calendar.iloc[:, 0]['Earnings Date']
+        if rp is None or rp.date != datetime.now().date():
+            rp = self._calculate_reference_prices()
+            self._reference_prices_cache.set(self.symbol, rp)
 
-        return result
+        return rp
 
-    def details_price(self) -> StonkDetails:
-        yf_df_2d_hourly = self._get_financials_adjusted('2d', '1h')
+    def _calculate_reference_prices(self) -> ReferencePrices:
         yf_df_1y_daily = self._get_financials_adjusted('1y', '1d')
-        d_24h_cond = yf_df_2d_hourly.index[-1] - timedelta(hours=24)
         d_7d = datetime.today() - timedelta(days=7)
         d_30d = datetime.today() - timedelta(days=30)
         d_52w = datetime.today() - timedelta(weeks=52)
         d_ytd = datetime(datetime.now().year, 1, 1)
 
-        price_24h_high = yf_df_2d_hourly.High[d_24h_cond:].max()
-        price_24h_low = yf_df_2d_hourly.Low[d_24h_cond:].min()
-        percent_change_1h = change_percent(yf_df_2d_hourly.Close[-2], self.current_price)
-        percent_change_24h = change_percent(get_last_value_times_series(yf_df_2d_hourly.Close, d_24h_cond),
-                                            self.current_price)
-        percent_change_7d = change_percent(get_last_value_times_series(yf_df_1y_daily.Close, d_7d), self.current_price)
-        percent_change_30d = change_percent(get_last_value_times_series(yf_df_1y_daily.Close, d_30d),
+        rp = ReferencePrices(date=datetime.now().date(),
+                             close_7d=get_last_value_times_series(yf_df_1y_daily.Close, d_7d),
+                             close_30d=get_last_value_times_series(yf_df_1y_daily.Close, d_30d),
+                             close_52w=get_last_value_times_series(yf_df_1y_daily.Close, d_52w),
+                             close_ytd=yf_df_1y_daily.Close[d_ytd:][0],
+                             price_52w_high=yf_df_1y_daily.High.max(),
+                             price_52w_low=yf_df_1y_daily.Low.min())
+
+        return rp
+
+    def details(self) -> Tuple[str, ChartImage]:
+        """Returns the price details text and the chart of the last trading day, both made of one download."""
+        yf_df_2d = self._get_financials_adjusted('2d', '15m')
+        text = self.details_price_textual(yf_df_2d)
+        # The chart shows the last trading day only.
+        yf_df_1d = yf_df_2d[yf_df_2d.index.date == yf_df_2d.index[-1].date()] if len(yf_df_2d) > 0 else yf_df_2d
+        ci = self.chart('1d', '15m', yf_df=yf_df_1d)
+
+        return text, ci
+
+    def details_price(self, yf_df_2d: Union[pd.DataFrame, None] = None) -> StonkDetails:
+        """Intraday values are calculated from bars of the last two trading days, which can be passed by `yf_df_2d`."""
+        if yf_df_2d is None:
+            yf_df_2d = self._get_financials_adjusted('2d', '15m')
+
+        rp = self.reference_prices()
+        d_24h_cond = yf_df_2d.index[-1] - timedelta(hours=24)
+        d_1h_cond = yf_df_2d.index[-1] - timedelta(hours=1)
+
+        price_24h_high = yf_df_2d.High[d_24h_cond:].max()
+        price_24h_low = yf_df_2d.Low[d_24h_cond:].min()
+        percent_change_1h = change_percent(get_last_value_times_series(yf_df_2d.Close, d_1h_cond), self.current_price)
+        percent_change_24h = change_percent(get_last_value_times_series(yf_df_2d.Close, d_24h_cond),
                                             self.current_price)
+        percent_change_7d = change_percent(rp.close_7d, self.current_price)
+        percent_change_30d = change_percent(rp.close_30d, self.current_price)
         if not self.percent_change_52w:
-            self.percent_change_52w = change_percent(get_last_value_times_series(yf_df_1y_daily.Close, d_52w),
-                                                     self.current_price)
-        percent_change_ytd = change_percent(yf_df_1y_daily.Close[d_ytd:][0], self.current_price)
+            self.percent_change_52w = change_percent(rp.close_52w, self.current_price)
+        percent_change_ytd = change_percent(rp.close_ytd, self.current_price)
+        # The reference range is calculated once a day, so the current price is taken into account as well.
+        price_52w_high = max(rp.price_52w_high, self.current_price)
+        price_52w_low = min(rp.price_52w_low, self.current_price)
 
         sd = StonkDetails(price=self.current_price, price_24h_high=price_24h_high, price_24h_low=price_24h_low,
-                          price_52w_high=self.price_52w_high, price_52w_low=self.price_52w_low,
+                          price_52w_high=price_52w_high, price_52w_low=price_52w_low,
                           percent_change_1h=percent_change_1h,
                           percent_change_24h=percent_change_24h, percent_change_7d=percent_change_7d,
                           percent_change_30d=percent_change_30d, percent_change_52w=self.percent_change_52w,
@@ -254,8 +465,8 @@ class Stonk(object):
 
         return sd
 
-    def details_price_textual(self) -> str:
-        sd = self.details_price()
+    def details_price_textual(self, yf_df_2d: Union[pd.DataFrame, None] = None) -> str:
+        sd = self.details_price(yf_df_2d)
 
         si_volume = si_format(sd.volume, precision=2)
         si_cap = si_format(round_currency_scalar(sd.market_capitalization), precision=2)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Chart output profile benchmark.
+
+Draws one candle chart of a fixed OHLC fixture and saves it with every output profile of `conf.CHART['profiles']`.
+Reports the mean save (layout, rasterization and encoding) time and the size of the encoded image per profile.
+
+Usage (from the repository root, a `stonks_bot/config.py` is required):
+python support/benchmark/chart_output.py --repeat 20 --bars 80
+"""
+import argparse
+import sys
+from time import perf_counter
+from typing import List
+
+# Also puts the repository root on the import path.
+from chart_render import ohlc_fixture
+
+from stonks_bot import conf
+from stonks_bot.helper.plot import PlotContext
+
+
+def main(args: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Compares the save time and image size of the output profiles.')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--bars', type=int, default=80)
+    args = parser.parse_args(args)
+    ohlc = ohlc_fixture(args.bars, seed=args.bars)
+
+    print(f"{'profile':<12} {'format':<6} {'ms/save':>10} {'bytes':>10}")
+
+    for name, profile in conf.CHART['profiles'].items():
+        with PlotContext(profile=name) as pc:
+            size = len(pc.create_candle_chart(ohlc, 'Fixture Inc.', 'FIX').getvalue())
+            time_start = perf_counter()
+
+            # The figure is kept, thus only saving the image is measured.
+            for _ in range(args.repeat):
+                pc._save_to_buffer()
+
+            time_save = (perf_counter() - time_start) / args.repeat
+
+        print(f"{name:<12} {profile['format']:<6} {time_save * 1000:>10.1f} {size:>10}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+Chart rendering stress test.
+
+Renders candle charts of fixed OHLC fixtures from many threads at the same time and compares every result with the
+chart of the same fixture rendered single threaded. Any difference means rendering is not thread safe.
+
+Usage (from the repository root, a `stonks_bot/config.py` is required):
+python support/benchmark/chart_render.py --threads 16 --charts 200
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from stonks_bot.helper.plot import PlotContext  # noqa: E402
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def ohlc_fixture(bars: int, seed: int) -> pd.DataFrame:
+    """Random walk OHLCV bars, which are identical for the same arguments."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, bars))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.uniform(0, 0.4, bars)
+    low = np.minimum(open_, close) - rng.uniform(0, 0.4, bars)
+    volume = rng.integers(1000, 100000, bars).astype(np.float64)
+    index = pd.date_range('2021-10-01 09:30', periods=bars, freq='15min', tz='Europe/Berlin')
+
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def render(ohlc: pd.DataFrame, symbol: str) -> bytes:
+    with PlotContext() as pc:
+        buf = pc.create_candle_chart(ohlc, 'Fixture Inc.', symbol)
+
+    return buf.getvalue()
+
+
+def main(args: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Renders charts from many threads and checks every result.')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--charts', type=int, default=200)
+    parser.add_argument('--fixtures', type=int, default=8)
+    parser.add_argument('--bars', type=int, default=32)
+    args = parser.parse_args(args)
+
+    fixtures = [ohlc_fixture(args.bars, seed) for seed in range(args.fixtures)]
+    expected = [render(f, f'FIX{i}') for i, f in enumerate(fixtures)]
+    jobs = [i % args.fixtures for i in range(args.charts)]
+
+    time_start = perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(lambda i: render(fixtures[i], f'FIX{i}'), jobs))
+
+    time_total = perf_counter() - time_start
+    failed = [i for i, (job, png) in enumerate(zip(jobs, results))
+              if not png.startswith(PNG_SIGNATURE) or png != expected[job]]
+
+    print(f'{args.charts} charts, {args.threads} threads: {time_total:.2f} s '
+          f'({time_total / args.charts * 1000:.1f} ms/chart), {len(failed)} failed.')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Candle chart renderer benchmark.
+
+Renders the same fixed OHLC fixtures with every renderer of `PlotContext` and reports the mean render time and PNG size
+per bar count.
+
+Usage (from the repository root, a `stonks_bot/config.py` is required):
+python support/benchmark/chart_renderers.py --repeat 20 --bars 26 80 390
+"""
+import argparse
+import sys
+from time import perf_counter
+from typing import List
+
+# Also puts the repository root on the import path.
+from chart_render import ohlc_fixture
+
+from stonks_bot.helper.plot import PlotContext
+
+RENDERERS = ['direct', 'mplfinance']
+
+
+def main(args: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Compares the render time of the candle chart renderers.')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--bars', type=int, nargs='+', default=[26, 80, 390])
+    args = parser.parse_args(args)
+
+    print(f"{'renderer':<12} {'bars':>6} {'ms/chart':>10} {'bytes':>10}")
+
+    for bars in args.bars:
+        ohlc = ohlc_fixture(bars, seed=bars)
+
+        for renderer in RENDERERS:
+            # Warm up: font cache, imports, etc.
+            with PlotContext(renderer) as pc:
+                size = len(pc.create_candle_chart(ohlc, 'Fixture Inc.', 'FIX').getvalue())
+
+            time_start = perf_counter()
+
+            for _ in range(args.repeat):
+                with PlotContext(renderer) as pc:
+                    pc.create_candle_chart(ohlc, 'Fixture Inc.', 'FIX')
+
+            time_chart = (perf_counter() - time_start) / args.repeat
+
+            print(f'{renderer:<12} {bars:>6} {time_chart * 1000:>10.1f} {size:>10}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))